@@ -16,5 +16,6 @@ SOURCES += app/view/main_window.py \
            app/components/profile_level_icon_widget.py \
            app/components/multi_lol_path_setting.py \
            app/lol/tools.py \
+           app/lol/localization.py \
 
 TRANSLATIONS += app/resource/i18n/Seraphine.zh_CN.ts
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+JSON 编解码
+
+装了 orjson (或 msgspec) 的话自动使用, 否则退回标准库的 json; 各个后端的 `loads` 都能直接接受 bytes,
+所以读响应时不用先 decode 成 str
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _jsonLoads(data):
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+
+    return json.loads(data)
+
+
+def _jsonDumps(obj):
+    return json.dumps(obj, ensure_ascii=False)
+
+
+BACKENDS = {'json': (_jsonLoads, _jsonDumps)}
+
+if msgspec is not None:
+    BACKENDS['msgspec'] = (msgspec.json.Decoder().decode,
+                           lambda obj: msgspec.json.encode(obj).decode('utf-8'))
+
+if orjson is not None:
+    BACKENDS['orjson'] = (orjson.loads,
+                          lambda obj: orjson.dumps(obj).decode('utf-8'))
+
+# 优先级: orjson > msgspec > json
+BACKEND = 'orjson' if orjson else 'msgspec' if msgspec else 'json'
+
+loads, dumps = BACKENDS[BACKEND]
+
+
+def loadsBody(body):
+    """
+    解析响应的 body, 与 `aiohttp.ClientResponse.json()` 一样, body 为空时返回 None
+    """
+    if not body.strip():
+        return None
+
+    return loads(body)
@@ -0,0 +1,171 @@
+import re
+
+import aiohttp
+
+from app.common import fastjson
+
+
+class FastJsonResponse(aiohttp.ClientResponse):
+    """
+    `.json()` 直接用 `fastjson` 解析 body 的 bytes, 不先 decode 成 str
+
+    Content-Type 的检查与 aiohttp 相同: 不是 JSON (如出错时返回的 html 页面) 时抛 `aiohttp.ContentTypeError`,
+    确实不是 application/json 的接口需要传 `content_type=None`
+
+    用法: `aiohttp.ClientSession(response_class=FastJsonResponse)`
+    """
+
+    # 与 aiohttp 判断 application/json 的正则相同, 也接受 application/xxx+json
+    JSON_CONTENT_TYPE = re.compile(r"^application/(?:[\w.+-]+?\+)?json")
+
+    async def json(self, *, encoding=None, loads=None, content_type='application/json'):
+        if loads is not None or encoding is not None or not self.__isExpected(content_type):
+            # 由 aiohttp 检查并解析, 不匹配时抛出的异常与原来完全相同
+            return await super().json(encoding=encoding, loads=loads or fastjson.loads,
+                                      content_type=content_type)
+
+        return fastjson.loadsBody(await self.read())
+
+    def __isExpected(self, contentType):
+        if not contentType:
+            return True
+
+        actual = self.headers.get(aiohttp.hdrs.CONTENT_TYPE, '').lower()
+
+        if contentType == 'application/json':
+            return self.JSON_CONTENT_TYPE.match(actual) is not None
+
+        return contentType in actual
+
+
+class HostMetrics:
+    __slots__ = ('requests', 'opened', 'reused', 'queued', 'inflight', 'maxInflight')
+
+    def __init__(self):
+        self.requests = 0
+
+        # 新建的连接 (需要 TCP + TLS 握手) / 复用 keep-alive 的连接
+        self.opened = 0
+        self.reused = 0
+
+        # 因为连接池满了而排队的次数
+        self.queued = 0
+
+        # 正在进行中的请求数, 约等于正在使用的连接数
+        self.inflight = 0
+        self.maxInflight = 0
+
+    def summary(self):
+        total = self.opened + self.reused
+
+        return {
+            'requests': self.requests,
+            'opened': self.opened,
+            'reused': self.reused,
+            'reuseRate': round(self.reused / total, 3) if total else 0,
+            'queued': self.queued,
+            'inflight': self.inflight,
+            'maxInflight': self.maxInflight,
+        }
+
+
+class HttpHub:
+    """
+    所有 HTTP 客户端共用的连接池
+
+    LCU、SGP、op.gg、大乱斗数据等各自的 session 只负责 base_url、认证与超时,
+    底层共用同一个 `TCPConnector`: 同一个 host 的连接在 keep-alive 期间可以被任何 session 复用,
+    DNS 结果也只解析一次, 选人阶段并发请求 SGP 与 op.gg 时不用反复握手
+
+    用法:
+
+        session = hub.session("https://lol-api-champion.op.gg", timeout=...)
+    """
+    # 总连接数与每个 host 的连接数上限; LCU 的并发另有 AdaptiveLimiter (最多 20) 控制
+    LIMIT = 100
+    LIMIT_PER_HOST = 30
+
+    KEEPALIVE_TIMEOUT = 30
+    DNS_TTL = 300
+
+    def __init__(self):
+        self.connector = None
+
+        # host -> HostMetrics
+        self.metrics = {}
+        self.traceConfig = self.__traceConfig()
+
+    def session(self, baseUrl=None, **kwargs) -> aiohttp.ClientSession:
+        """
+        创建一个使用共享连接池的 session, 关闭 session 不会关闭连接池;
+        参数与 `aiohttp.ClientSession` 相同, 默认使用 `FastJsonResponse`
+        """
+        kwargs.setdefault('response_class', FastJsonResponse)
+
+        return aiohttp.ClientSession(baseUrl, connector=self.__getConnector(),
+                                     connector_owner=False,
+                                     trace_configs=[self.traceConfig], **kwargs)
+
+    def __getConnector(self):
+        # TCPConnector 需要在事件循环中创建, 所以推迟到第一次使用时
+        if self.connector is None or self.connector.closed:
+            self.connector = aiohttp.TCPConnector(
+                limit=self.LIMIT,
+                limit_per_host=self.LIMIT_PER_HOST,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=self.DNS_TTL,
+            )
+
+        return self.connector
+
+    def __host(self, ctx) -> HostMetrics:
+        metrics = self.metrics.get(ctx.host)
+
+        if metrics is None:
+            metrics = self.metrics[ctx.host] = HostMetrics()
+
+        return metrics
+
+    def __traceConfig(self):
+        config = aiohttp.TraceConfig()
+
+        async def onRequestStart(session, ctx, params):
+            ctx.host = f"{params.url.host}:{params.url.port}"
+
+            metrics = self.__host(ctx)
+            metrics.requests += 1
+            metrics.inflight += 1
+            metrics.maxInflight = max(metrics.maxInflight, metrics.inflight)
+
+        async def onRequestDone(session, ctx, params):
+            self.__host(ctx).inflight -= 1
+
+        async def onConnectionQueued(session, ctx, params):
+            self.__host(ctx).queued += 1
+
+        async def onConnectionCreated(session, ctx, params):
+            self.__host(ctx).opened += 1
+
+        async def onConnectionReused(session, ctx, params):
+            self.__host(ctx).reused += 1
+
+        config.on_request_start.append(onRequestStart)
+        config.on_request_end.append(onRequestDone)
+        config.on_request_exception.append(onRequestDone)
+        config.on_connection_queued_start.append(onConnectionQueued)
+        config.on_connection_create_end.append(onConnectionCreated)
+        config.on_connection_reuseconn.append(onConnectionReused)
+
+        return config
+
+    def stats(self):
+        return {host: metrics.summary() for host, metrics in self.metrics.items()}
+
+    async def close(self):
+        if self.connector is not None:
+            await self.connector.close()
+            self.connector = None
+
+
+hub = HttpHub()
@@ -76,6 +76,9 @@ class Logger:
         log_path = os.path.join('log', log_file)
         return log_path
 
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
     def log(self, level, message, tag=None):
         # FIXME if tag is none an exception will be thrown
         extra = {'TAG': tag} if tag else {}
@@ -10,6 +10,7 @@ class SignalBus(QObject):
     lolClientStarted = pyqtSignal(int)
     lolClientEnded = pyqtSignal()
     lolClientChanged = pyqtSignal(int)
+    lolClientPidsChanged = pyqtSignal(list)
 
     terminateListeners = pyqtSignal()
 
@@ -1,5 +1,4 @@
 from qasync import asyncSlot
-import aiohttp
 import os
 import shutil
 import sys
@@ -17,6 +16,7 @@ from app.common.qfluentwidgets import (MessageBoxBase, SmoothScrollArea,
 
 from app.common.config import VERSION, cfg, LOCAL_PATH, BETA
 from app.common.util import getLolClientPidSlowly
+from app.common.http import hub
 from app.common.signals import signalBus
 from app.common.update import runUpdater
 from app.lol.connector import connector
@@ -126,7 +126,7 @@ class UpdateMessageBox(MessageBoxBase):
         if os.path.exists(dirPath):
             shutil.rmtree(dirPath, ignore_errors=True)
 
-        async with aiohttp.ClientSession() as sess:
+        async with hub.session() as sess:
             resp = await sess.get(url)
             length = int(resp.headers['content-length'])
             self.bar.setMaximum(length)
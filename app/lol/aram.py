@@ -7,7 +7,9 @@ import aiohttp
 
 from app.common.config import cfg, LOCAL_PATH
 from app.common.logger import logger
+from app.common.http import hub
 from app.common.util import getLolClientVersion
+from app.lol.upstream import upstreams
 
 
 class AramBuff:
@@ -78,8 +80,12 @@ class AramBuff:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            timeout = aiohttp.ClientTimeout(total=10, sock_connect=5)
+
+            async with hub.session(timeout=timeout) as session, \
+                    upstreams['jddld'].guard() as guard:
                 res = await session.get(url, params=params, proxy=None, ssl=False)
+                guard.status = res.status
                 data = await res.json()
         except:
             logger.warning(f"Getting Aram buff failed", self.TAG)
@@ -0,0 +1,78 @@
+import os
+
+
+class AssetIndex:
+    """
+    已经下载到本地的游戏资源文件 (图标、原画等)
+
+    启动时扫描一次资源目录, 之后每下载一个文件就加进来; 查询只是一次集合查找, 不再每次 `os.path.exists`
+
+    所有客户端共用同一个资源目录, 所以只有一个实例 `assets`
+    """
+
+    ROOT = "app/resource/game"
+
+    def __init__(self, root=ROOT):
+        self.root = root
+
+        # 规范化之后的路径
+        self.paths = set()
+        self.loaded = False
+
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """
+        扫描资源目录; 可以在线程中调用, 扫描完成后才替换索引
+        """
+        if self.loaded:
+            return
+
+        paths = set()
+
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                paths.add(os.path.normpath(os.path.join(folder, name)))
+
+        # 加上扫描期间下载完成的文件
+        self.paths = paths | self.paths
+        self.loaded = True
+
+    def __contains__(self, path):
+        path = os.path.normpath(path)
+
+        found = path in self.paths
+
+        # 还没扫描完, 退回到直接检查文件
+        if not found and not self.loaded and os.path.exists(path):
+            self.paths.add(path)
+            found = True
+
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return found
+
+    def add(self, path):
+        self.paths.add(os.path.normpath(path))
+
+    def discard(self, folder):
+        """
+        目录下的文件被删掉了 (如设置中的清除缓存), 从索引中移除, 之后用到时重新下载
+        """
+        prefix = os.path.join(os.path.normpath(folder), '')
+        self.paths = {path for path in self.paths if not path.startswith(prefix)}
+
+    def stats(self):
+        return {
+            'files': len(self.paths),
+            'loaded': self.loaded,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+assets = AssetIndex()
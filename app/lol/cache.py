@@ -0,0 +1,131 @@
+import re
+import time
+from collections import OrderedDict
+
+from app.common.fastjson import loadsBody
+
+
+class CachedResponse:
+    """
+    缓存下来的响应
+
+    只保留状态码与 body, 读取接口与 `aiohttp.ClientResponse` 保持一致,
+    每次 `.json()` 都会重新解析, 调用者之间不会共享同一个对象
+    """
+
+    def __init__(self, status, body: bytes):
+        self.status = status
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def text(self, encoding='utf-8'):
+        return self.body.decode(encoding)
+
+    async def json(self, *, encoding='utf-8', loads=None, content_type=None):
+        if loads is not None:
+            return loads(self.body.decode(encoding))
+
+        return loadsBody(self.body)
+
+
+class CachePolicy:
+    def __init__(self, pattern: str, ttl):
+        """
+        @param pattern: 匹配请求 path 的正则
+        @param ttl: 缓存有效期 (秒), None 表示永不过期 (如已经结束的对局详情)
+        """
+        self.pattern = re.compile(pattern)
+        self.ttl = ttl
+
+
+# 按接口区分缓存策略, 不在这里的接口不缓存
+LCU_CACHE_POLICIES = [
+    # 对局结束后详情就不会再变了
+    CachePolicy(r"^/lol-match-history/v1/games/\d+$", None),
+
+    CachePolicy(r"^/lol-summoner/v2/summoners/puuid/[^/]+$", 300),
+    CachePolicy(r"^/lol-summoner/v1/summoners/\d+$", 300),
+
+    CachePolicy(r"^/lol-ranked/v1/ranked-stats/[^/]+$", 60),
+
+    # 批量段位, 按 puuid 列表缓存; 同一个对局 / 房间反复打开时查的是同一批召唤师
+    CachePolicy(r"^/lol-ranked/v2/tiers$", 60),
+
+    CachePolicy(r"^/lol-match-history/v1/products/lol/[^/]+/matches$", 60),
+]
+
+
+class ResponseCache:
+    def __init__(self, policies, maxSize=512):
+        self.policies = policies
+        self.maxSize = maxSize
+
+        # key -> (过期时间, path, CachedResponse), 按最近使用排序
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def match(self, path):
+        for policy in self.policies:
+            if policy.pattern.match(path):
+                return policy
+
+        return None
+
+    def get(self, key):
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expire, _, response = entry
+
+        if expire is not None and expire < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        return response
+
+    def put(self, key, path, response: CachedResponse, policy: CachePolicy):
+        expire = None if policy.ttl is None else time.monotonic() + policy.ttl
+
+        self.entries[key] = (expire, path, response)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, prefix):
+        """
+        删掉所有 path 以 `prefix` 开头的缓存
+        """
+        keys = [key for key, (_, path, _) in self.entries.items()
+                if path.startswith(prefix)]
+
+        for key in keys:
+            del self.entries[key]
+
+        self.invalidations += len(keys)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / total if total else 0,
+            'invalidations': self.invalidations,
+            'size': len(self.entries),
+        }
@@ -0,0 +1,84 @@
+"""
+游戏数据 (`JsonManager`) 的索引
+
+JsonManager 保存的是可以写入快照的原始结构; 查询用的正向、反向索引在第一次用到时由这里的函数建好,
+之后每次查询都只是一次字典访问
+"""
+import re
+import sys
+
+from app.lol.models import Record
+
+
+# 符文描述中, 除了 <br>、<i>、<b>、<font color='xxx'> 以外的所有 html 标签
+RUNE_DESC_TAGS = re.compile(
+    r"(?!<br\s*/?>|<i>|</i>|<b>|</b>|<font color='[^']+'>|</font>)(<[^>]+>)")
+
+
+def cleanRuneDesc(desc: str):
+    desc = RUNE_DESC_TAGS.sub('', desc)
+
+    # 移除末尾多余的换行
+    return desc.strip().strip("<br>")
+
+
+class SkinRecord(Record):
+    """
+    支持 `skin['skinId']` 的读法, 与原来皮肤列表中的 dict 兼容
+    """
+    __slots__ = ('skinId', 'name', 'championId', 'splashPath',
+                 'uncenteredSplashPath', 'augmentId')
+
+    def __init__(self, skinId, name, championId, splashPath, uncenteredSplashPath,
+                 augmentId=None):
+        self.skinId = skinId
+        self.name = name
+        self.championId = championId
+        self.splashPath = splashPath
+        self.uncenteredSplashPath = uncenteredSplashPath
+        self.augmentId = augmentId
+
+
+def buildChampionIds(champs):
+    """
+    @param champs: 英雄 id -> 英雄名
+    @return: 英雄名 -> 英雄 id
+    """
+    return {sys.intern(name): championId for championId, name in champs.items()}
+
+
+def buildRuneIcons(runes, styles):
+    """
+    @param runes: 符文 id -> {'icon', 'name', 'desc'}
+    @param styles: perkstyles.json 中的 `styles`
+    @return: 符文 id 或符文系 id -> 图标路径
+    """
+    icons = {style['id']: style['iconPath'] for style in styles}
+    icons.update((runeId, rune['icon']) for runeId, rune in runes.items())
+
+    return icons
+
+
+def buildSkinLists(champions, skinAugments):
+    """
+    @param champions: 英雄名 -> {'id', 'skins': {皮肤名: {'skinId', 'splashPath', 'uncenteredSplashPath'}}}
+    @param skinAugments: 皮肤 id -> 签名 (augment) 的 contentId
+    @return: 英雄名 -> [(皮肤名, SkinRecord)]
+    """
+    skinLists = {}
+
+    for championName, champion in champions.items():
+        championId = champion.get('id')
+        items = []
+
+        for skinName, skin in champion['skins'].items():
+            skinName = sys.intern(skinName)
+            record = SkinRecord(skin['skinId'], skinName, championId,
+                                skin['splashPath'], skin['uncenteredSplashPath'],
+                                skinAugments.get(skin['skinId']))
+
+            items.append((skinName, record))
+
+        skinLists[sys.intern(championName)] = items
+
+    return skinLists
@@ -7,7 +7,10 @@ import aiohttp
 
 from app.common.config import cfg, LOCAL_PATH
 from app.common.logger import logger
+from app.common.fastjson import loads
+from app.common.http import hub
 from app.common.util import getLolClientVersion
+from app.lol.upstream import upstreams
 
 
 class ChampionAlias:
@@ -29,14 +32,15 @@ class ChampionAlias:
         logger.info("Update champions alias", self.TAG)
 
         try:
-            async with aiohttp.ClientSession() as session:
-                res = await session.get(self.URL, proxy=None, ssl=False)
+            timeout = aiohttp.ClientTimeout(total=10, sock_connect=5)
 
-                # 不知道为什么这样子不行：
-                # res = await res.json()
+            async with hub.session(timeout=timeout) as session, \
+                    upstreams['gtimg'].guard() as guard:
+                res = await session.get(self.URL, proxy=None, ssl=False)
+                guard.status = res.status
 
-                s = str(await res.read(), encoding='utf-8')
-                res = json.loads(s)
+                # 返回的 Content-Type 不是 application/json, 不能直接用 aiohttp 的 res.json()
+                res = loads(await res.read())
 
             champions = {}
 
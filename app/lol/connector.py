@@ -1,22 +1,48 @@
-import inspect
 import os
-import json
+import logging
 import threading
 import re
+import sys
+import random
 from collections import deque
 
 import requests
 import time
 
 import asyncio
+import weakref
+from functools import cached_property
+from types import MappingProxyType
 import aiohttp
 from PyQt5.QtCore import pyqtSignal, QObject
 
-from app.common.config import cfg, Language
+from app.common.config import cfg
 from app.common.logger import logger
+from app.common.fastjson import loads, dumps
+from app.common.http import hub
 from app.common.signals import signalBus
 from app.common.util import getPortTokenServerByPid, getTasklistPath, getLolClientPid
 from app.lol.exceptions import *
+from app.lol.singleflight import SingleFlight
+from app.lol.cache import ResponseCache, CachedResponse, LCU_CACHE_POLICIES
+from app.lol.mirror import StateMirror, LCU_MIRRORED_RESOURCES
+from app.lol.router import EventRouter
+from app.lol.tokens import TokenManager
+from app.lol.models import championIconPath, itemIconPath, runeIconPath, summonerSpellIconPath
+from app.lol.limiter import AdaptiveLimiter
+from app.lol.startup import StartupGraph
+from app.lol.snapshot import Snapshot, writeSnapshot
+from app.lol.localization import localization
+from app.lol.assets import assets
+from app.lol.catalog import (cleanRuneDesc, buildChampionIds, buildRuneIcons,
+                             buildSkinLists)
+from app.lol.scheduler import Priority, currentPriority
+from app.lol.retry import RetryPolicy, RetryBudget, RetryStats, callWithRetry
+from app.lol.middleware import (compose, invoke, Call, CallMeta, Request, Metrics,
+                                metricsMiddleware, retryMiddleware, singleFlightMiddleware)
+from app.lol.upstream import upstreams, clientUpstreams, upstreamMiddleware
+from app.lol.deadline import (deadlineMiddleware, timeoutMiddleware,
+                              LCU_TIMEOUTS, SGP_TIMEOUTS)
 
 requests.packages.urllib3.disable_warnings()
 
@@ -24,199 +50,362 @@ TAG = "Connector"
 
 
 class PastRequest:
-    def __init__(self, func: str, params_dict, kwargs):
-        self.func = func  # 此处需要func.__name__ 而不是func本身的obj
-        self.params_dict = params_dict
-        self.kwargs = kwargs
+    def __init__(self, call: Call):
+        self.call = call
         self.response = None
         self.timestamp = time.time()
 
     def __str__(self):
+        # 参数字典只在打印时才构建
+        attrs = {
+            'func': self.call.meta.name,
+            'params_dict': self.call.params(),
+            'kwargs': self.call.kwargs,
+            'response': self.response,
+            'timestamp': self.timestamp,
+        }
+
         # 如果是None的成员, 不会被打印; 没打印response就是没有响应;
-        attrs = [f"{k}={v!r}" for k, v in self.__dict__.items()
-                 if v is not None]
+        attrs = [f"{k}={v!r}" for k, v in attrs.items() if v is not None]
         return f"PastRequest({', '.join(attrs)})"
 
 
-def needLcu():
-    def decorator(func):
-        async def wrapper(*args, **kwargs):
-            if connector.lcuSess is None:
-                raise ReferenceError
+def recordMiddleware(giveUpOn):
+    """
+    记录调用 (崩溃时输出最近的调用) 与日志, 最终失败时弹出提示
+    """
+    async def middleware(call: Call, next):
+        name = call.meta.name
+        logger.info(f"call {name}", TAG)
 
-            return await func(*args, **kwargs)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"args = {call.params()}|kwargs = {call.kwargs}", TAG)
 
-        return wrapper
+        req_obj = PastRequest(call)
+        owner = ownerOf(call)
 
-    return decorator
+        with owner.dqLock:
+            owner.callStack.append(req_obj)
 
+        try:
+            res = await next(call)
+        except (asyncio.CancelledError, *giveUpOn):
+            raise
+        except BaseException as exce:
+            # ClientNotConnected 为没有连接客户端仍有请求发送时抛出,
+            # ReferenceError 为客户端还没准备好 (重试之后仍然没有),
+            # DeadlineExceeded 为结果已经没人要了, 都直接吞掉不用提示
+            # 其余异常弹一个提示
+            # 后台保温的客户端出错不打扰用户, 切换过去时会重新请求
+            if type(exce) not in (ClientNotConnected, ReferenceError, DeadlineExceeded) \
+                    and owner.isActive:
+                signalBus.lcuApiExceptionRaised.emit(name, exce)
 
-def retry(count=5, retry_sep=0):
-    def decorator(func):
-        async def wrapper(*args, **kwargs):
-            logger.info(f"call %s" % func.__name__, TAG)
-
-            # 获取函数的参数信息
-            func_params = inspect.signature(func).parameters
-            param_names = list(func_params.keys())
-
-            tmp_args = args
-            if param_names[0] == "self":
-                # args[0] 是 self(connector) 的实例, 兼容静态方法
-                param_names = param_names[1:]
-                tmp_args = args[1:]
-
-            # 构建参数字典，将参数名与对应的实参值一一对应
-            params_dict = {param: arg for param,
-                           arg in zip(param_names, tmp_args)}
-
-            logger.debug(f"args = {params_dict}|kwargs = {kwargs}", TAG)
-            # logger.debug(f"args = {args[1:]}|kwargs = {kwargs}", TAG)
-
-            with connector.dqLock:
-                req_obj = PastRequest(
-                    func.__name__,
-                    params_dict,
-                    kwargs
-                )
-                connector.callStack.append(req_obj)
-
-            exce = None
-            for _ in range(count):
-                try:
-                    async with connector.semaphore:
-                        res = await func(*args, **kwargs)
-                except BaseException as e:
-                    time.sleep(retry_sep)
-                    exce = e
+            req_obj.response = exce
+            logger.exception(f"exit {name}", exce, TAG)
 
-                    # SummonerNotFound 再重试会报 429 (限流)
-                    if isinstance(e, SummonerNotFound):
-                        raise e
+            raise exce
 
-                    continue
-                else:
-                    break
-            else:
-                # 有异常抛异常, 没异常抛 RetryMaximumAttempts
-                exce = exce if exce else RetryMaximumAttempts(
-                    "Exceeded maximum retry attempts.")
+        req_obj.response = res
 
-                # ReferenceError 为 LCU 未就绪仍有请求发送时抛出, 直接吞掉不用提示
-                # 其余异常弹一个提示
-                if type(exce) is not ReferenceError:
-                    signalBus.lcuApiExceptionRaised.emit(
-                        func.__name__, exce)
+        logger.info(f"exit {name}", TAG)
 
-                with connector.dqLock:
-                    req_obj.response = exce
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"result = {res}", TAG)
 
-                logger.exception(f"exit {func.__name__}", exce, TAG)
+        return res
 
-                raise exce
+    return middleware
 
-            with connector.dqLock:
-                req_obj.response = res
 
-            logger.info(f"exit {func.__name__}", TAG)
-            logger.debug(f"result = {res}", TAG)
+def ownerOf(call: Call) -> 'LolClientConnector':
+    """
+    发起调用的 connector (被装饰方法绑定的 self); 连接池中每个客户端的调用记录与统计各自独立
+    """
+    return call.args[0]
 
-            return res
+
+def retry(count=5, base=.2, giveUpOn=(SummonerNotFound,), retryOn=(BaseException,)):
+    """
+    @param count: 最多尝试的次数
+    @param base: 第一次重试前的等待时间 (秒), 之后指数退避
+    @param giveUpOn: 不重试的异常, 如 SummonerNotFound 再重试会报 429 (限流)
+    @param retryOn: 需要重试的异常
+
+    被装饰的函数依次经过 记录 -> 统计 -> 重试 三个中间件, 调用链在 import 时组合好;
+    每个被装饰的接口有自己独立的重试预算
+    """
+    # 没有连接客户端时 (ClientNotConnected) 立即失败, 不做退避重试; 它仍然由记录中间件吞掉提示
+    policy = RetryPolicy(count, base, giveUpOn=(*giveUpOn, ClientNotConnected),
+                         retryOn=retryOn, budget=RetryBudget())
+
+    def decorator(func):
+        meta = CallMeta(func)
+        chain = compose([
+            recordMiddleware(giveUpOn),
+            metricsMiddleware(lambda call: ownerOf(call).callMetrics,
+                              lambda call: call.meta.name),
+            retryMiddleware(policy, lambda call: ownerOf(call).retryStats),
+        ], invoke)
+
+        async def wrapper(*args, **kwargs):
+            return await chain(Call(meta, args, kwargs))
 
         return wrapper
 
     return decorator
 
 
+def compactRankedTiers(achievedTiers):
+    """
+    将 `/lol-ranked/v2/tiers` 中单个召唤师的 `achievedTiers` 转为 {queueType: {'tier', 'division', 'lp'}};
+    这个接口不带胜点, `lp` 为空, 需要时由 `compactRankedStats` 补上
+    """
+    return {t['queueType']: {
+        'tier': t.get('tier', ''),
+        'division': t.get('division', 'NA'),
+        'lp': '',
+    } for t in achievedTiers if 'queueType' in t}
+
+
+def compactRankedStats(stats):
+    """
+    将 `/lol-ranked/v1/ranked-stats/{puuid}` 的完整数据转为 {queueType: {'tier', 'division', 'lp'}}
+    """
+    return {queueType: {
+        'tier': queue.get('tier', ''),
+        'division': queue.get('division', 'NA'),
+        # 斗魂竞技场没有胜点, 用的是积分
+        'lp': queue.get('ratedRating', '') if queueType == 'CHERRY' else queue.get('leaguePoints', ''),
+    } for queueType, queue in stats.get('queueMap', {}).items()}
+
+
 class LcuWebSocket():
+    # 断线重连的等待时间 (秒), 每次失败翻倍
+    RECONNECT_BASE = .5
+    RECONNECT_CAP = 10.
+
     def __init__(self, port, token):
         self.port = port
         self.token = token
 
         self.events = []
-        self.subscribes = []
+        self.router = EventRouter()
+
+        # 订阅完成 / 连接断开 / 断线重连并补发完事件时调用, 无参数
+        self.onConnected = []
+        self.onClosed = []
+        self.onReconnected = []
+
+        # uri -> 最近一次事件的 data, 以及收到的事件数, 用于重连后判断错过了哪些事件
+        self.lastData = {}
+        self.seqs = {}
+
+        self.connects = 0
+        self.synthesized = 0
+        self.backfillTask = None
+
+    def subscribe(self, event: str, uri: str = '', type: tuple = ('Update', 'Create', 'Delete'),
+                  coalesce=False):
+        '''
+        If the 'uri' or 'type' is empty, it matches any event.
 
-    def subscribe(self, event: str, uri: str = '', type: tuple = ('Update', 'Create', 'Delete')):
+        @param coalesce: 回调来不及处理时, 只处理最新的事件
+        '''
         def wrapper(func):
             self.events.append(event)
-            self.subscribes.append({
-                'uri': uri,
-                'type': type,
-                'callable': func
-            })
+            self.router.add(uri, type, func, coalesce)
             return func
 
         return wrapper
 
-    def matchUri(self, data):
-        for s in self.subscribes:
-            # If the 'uri' or 'type' is empty, it matches any event.
-            if not (s.get('uri') or s.get('type')) or (
-                    data.get('uri') == s['uri'] and data.get('eventType') in s['type']):
-                logger.info(s['uri'], TAG)
-                logger.debug(data, TAG)
-                asyncio.create_task(s['callable'](data))
-                # return
-
     async def runWs(self):
-        self.session = aiohttp.ClientSession(
-            auth=aiohttp.BasicAuth('riot', self.token),
-            headers={
-                'Content-type': 'application/json',
-                'Accept': 'application/json'
-            }
-        )
+        delay = self.RECONNECT_BASE
+
+        while True:
+            try:
+                await self.__connect()
+            except (aiohttp.ClientError, OSError) as e:
+                logger.warning(f"WebSocket connect failed: {e}", TAG)
+            else:
+                delay = self.RECONNECT_BASE
+                await self.__receive()
+
+            for callback in self.onClosed:
+                callback()
+
+            # 客户端真的退出了的话, connector.close() 会取消这个任务
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+            delay = min(self.RECONNECT_CAP, delay * 2)
+
+    async def __connect(self):
         address = f'wss://127.0.0.1:{self.port}/'
         self.ws = await self.session.ws_connect(address, ssl=False)
 
-        for event in self.events:
+        # 同一个事件可能有多个订阅者, 只需要向 LCU 订阅一次
+        for event in dict.fromkeys(self.events):
             await self.ws.send_json([5, event])
 
+        self.connects += 1
+
+        for callback in self.onConnected:
+            callback()
+
+        if self.connects > 1:
+            logger.warning("WebSocket reconnected", TAG)
+            self.backfillTask = asyncio.create_task(self.__backfill())
+
+    async def __receive(self):
         while True:
             msg = await self.ws.receive()
 
             if msg.type == aiohttp.WSMsgType.TEXT and msg.data != '':
-                data = json.loads(msg.data)[2]
-                self.matchUri(data)
-            elif msg.type == aiohttp.WSMsgType.CLOSED:
-                logger.info("WebSocket closed", TAG)
+                data = loads(msg.data)[2]
+                self.__dispatch(data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                logger.info(f"WebSocket closed: {msg.type}", TAG)
                 break
 
-        await self.session.close()
+    def __dispatch(self, data):
+        uri = data.get('uri')
+
+        self.lastData[uri] = data.get('data') if data.get(
+            'eventType') != 'Delete' else None
+        self.seqs[uri] = self.seqs.get(uri, 0) + 1
+
+        self.router.dispatch(data)
+
+    async def __backfill(self):
+        """
+        断线期间的事件都丢了, 重新拉一遍订阅的资源, 与断线前最后的状态不一样的补发一个事件
+        """
+        uris = [uri for uri in dict.fromkeys(r.uri for r in self.router.routes) if uri]
+
+        await asyncio.gather(*[self.__backfillUri(uri) for uri in uris])
+
+        for callback in self.onReconnected:
+            callback()
+
+    async def __backfillUri(self, uri):
+        seq = self.seqs.get(uri, 0)
+
+        try:
+            async with self.session.get(f'https://127.0.0.1:{self.port}{uri}', ssl=False,
+                                        timeout=aiohttp.ClientTimeout(total=5)) as res:
+                if res.status == 404:
+                    eventType, data = 'Delete', None
+                elif res.status >= 400:
+                    return
+                else:
+                    eventType, data = 'Update', await res.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"backfill {uri} failed: {e}", TAG)
+            return
+
+        # 请求期间已经收到了新的事件, 或者状态其实没变
+        if self.seqs.get(uri, 0) != seq or self.lastData.get(uri) == data:
+            return
+
+        self.synthesized += 1
+        self.__dispatch({'uri': uri, 'eventType': eventType, 'data': data})
 
     async def start(self):
         if "OnJsonApiEvent" in self.events:
             raise AssertionError(
                 "You should not use OnJsonApiEvent to subscribe to all events. If you wish to debug "
                 "the program, comment out this line.")
+
+        self.session = hub.session(
+            auth=aiohttp.BasicAuth('riot', self.token),
+            headers={
+                'Content-type': 'application/json',
+                'Accept': 'application/json'
+            },
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=3)
+        )
+
         # 防止阻塞 connector.start()
         self.task = asyncio.create_task(self.runWs())
 
     async def close(self):
         self.task.cancel()
+
+        if self.backfillTask:
+            self.backfillTask.cancel()
+
+        self.router.close()
         await self.session.close()
 
+    def stats(self):
+        return {
+            'reconnects': max(0, self.connects - 1),
+            'synthesized': self.synthesized,
+            'router': self.router.stats(),
+        }
+
 
 class LolClientConnector(QObject):
+    # 批量查询接口每次请求最多携带的 id 数
+    BATCH_SIZE = 20
+
+    # (游戏版本, 语言) -> JsonManager; 同一版本的多个客户端共用一份游戏数据,
+    # 没有客户端引用时自动释放
+    sharedManagers = weakref.WeakValueDictionary()
+    managerFlight = SingleFlight()
+
+    # 处理好的游戏数据快照, 按大区、版本与语言区分, 每个大区只保留最新的一份
+    SNAPSHOT_FOLDER = "app/resource/game/snapshots"
 
     def __init__(self):
         super().__init__()
+
+        # 是否为界面当前绑定的客户端, 只有它会发出 signalBus 的信号, 由 ConnectorPool 设置
+        self.isActive = False
         self.maxRefCnt = cfg.get(cfg.apiConcurrencyNumber)
 
-        self.semaphore = None
+        self.dqLock = threading.Lock()
+        self.callStack = deque(maxlen=10)
+        self.retryStats = RetryStats()
+        self.callMetrics = Metrics()
+        self.httpMetrics = Metrics()
+
+        # 合并同时发起的相同 GET 请求, 以及同一个资源文件的并发下载
+        self.requestFlight = SingleFlight()
+        self.assetFlight = SingleFlight()
+
+        # 按接口缓存 GET 的响应, 由 websocket 事件负责让其失效
+        self.cache = ResponseCache(LCU_CACHE_POLICIES)
+
+        self.__resetClientState()
+        self.__initPipelines()
+
+    def __resetClientState(self):
+        """
+        与所连接的客户端有关的状态; `close` 之后回到这里, 调用链与 `isActive` 不变
+        """
+        self.limiter = None
         self.lcuSess = None
         self.sgpSess = None
         self.port = None
         self.token = None
-        self.sgpToken = None
         self.server = None
         self.inMainLand = False
 
         self.manager = None
         self.perksStyleCache = None
 
-        self.dqLock = threading.Lock()
-        self.callStack = deque(maxlen=10)
+        # 从网络加载了游戏数据, 整理好符文之后需要写入的快照路径
+        self.snapshotPending = None
+
+        # 按 JWT 的过期时间提前刷新, 被 SGP 拒绝时刷新一次再重放
+        self.sgpTokens = TokenManager(self.getSGPtoken)
+
+        # 对局流程相关的状态由 websocket 推送, 读取时不用再请求 LCU
+        self.mirror = StateMirror(LCU_MIRRORED_RESOURCES)
+
+        # 本客户端的 LCU 与 SGP 各自限速、熔断, 不受连接池中其他客户端影响
+        self.upstreams = clientUpstreams()
 
     async def autoStart(self):
         '''
@@ -233,46 +422,90 @@ class LolClientConnector(QObject):
         try:
             self.port, self.token, self.server = getPortTokenServerByPid(pid)
         except:
-            signalBus.getCmdlineError.emit()
+            if self.isActive:
+                signalBus.getCmdlineError.emit()
             return
 
-        self.semaphore = asyncio.Semaphore(self.maxRefCnt)
+        # 设置项中的并发数只作为初始窗口, 之后根据延迟与错误率自动调整
+        self.limiter = AdaptiveLimiter(initial=self.maxRefCnt)
+
+        # 互不依赖的步骤同时进行
+        graph = StartupGraph(f"connector {pid}")
+        graph.add("sessions", self.__initSessions)
+        graph.add("platform", self.__initPlatformInfo)
+        graph.add("folder", self.__initFolder)
+        graph.add("assets", self.__initAssets, deps=("folder",))
+        graph.add("sgpToken", self.__initSgpToken, deps=("sessions",))
+        graph.add("manager", self.__initManager, deps=("sessions",))
+        graph.add("listener", self.__runListener, deps=("sessions",))
+        graph.add("runeStyle", self.__initRuneStyle, deps=("manager", "assets"))
+        graph.add("snapshot", self.__saveSnapshot, deps=("runeStyle",))
 
-        await self.__initSessions()
-        self.__initPlatformInfo()
-        await self.__initManager()
-        self.__initFolder()
-        await self.__runListener()
-        await self.__initRuneStyle()
+        try:
+            await graph.run()
+        finally:
+            logger.info(graph.report(), TAG)
 
         logger.critical(f"connector started, server: {self.server}", TAG)
 
     async def __runListener(self):
         self.listener = LcuWebSocket(self.port, self.token)
 
+        # 镜像要先于其他订阅者收到事件, 这样回调里读到的已经是最新的状态
+        self.mirror.attach(self.listener)
+        self.listener.onConnected.append(lambda: self.mirror.setLive(True))
+        self.listener.onClosed.append(lambda: self.mirror.setLive(False))
+
+        # 断线期间可能错过了对局结束等让缓存失效的事件, 宁可多失效一些
+        self.listener.onReconnected.append(self.__onListenerReconnected)
+
         @self.listener.subscribe(event='OnJsonApiEvent_lol-summoner_v1_current-summoner',
                                  uri='/lol-summoner/v1/current-summoner',
                                  type=('Update',))
         async def onCurrentSummonerProfileChanged(event):
-            signalBus.currentSummonerProfileChanged.emit(event['data'])
+            data = event['data']
+
+            self.cache.invalidate(
+                f"/lol-summoner/v2/summoners/puuid/{data.get('puuid')}")
+            self.cache.invalidate(
+                f"/lol-summoner/v1/summoners/{data.get('summonerId')}")
+
+            if self.isActive:
+                signalBus.currentSummonerProfileChanged.emit(data)
 
         @self.listener.subscribe(event='OnJsonApiEvent_lol-gameflow_v1_gameflow-phase',
                                  uri='/lol-gameflow/v1/gameflow-phase',
                                  type=('Update',))
         async def onGameFlowPhaseChanged(event):
-            signalBus.gameStatusChanged.emit(event['data'])
+            # 对局结束后, 战绩列表和段位都可能发生变化
+            if event['data'] == 'EndOfGame':
+                self.cache.invalidate("/lol-match-history/v1/products/lol/")
+                self.cache.invalidate("/lol-ranked/v1/ranked-stats/")
+                self.cache.invalidate("/lol-ranked/v2/tiers")
+
+            if self.isActive:
+                signalBus.gameStatusChanged.emit(event['data'])
 
         @self.listener.subscribe(event='OnJsonApiEvent_lol-champ-select_v1_session',
                                  uri='/lol-champ-select/v1/session',
                                  type=('Update',))
         async def onChampSelectChanged(event):
-            signalBus.champSelectChanged.emit(event)
+            # 只是转发给 MainWindow, 合并由那边包着真正处理的 Coalescer 负责
+            if self.isActive:
+                signalBus.champSelectChanged.emit(event)
 
         @self.listener.subscribe(event="OnJsonApiEvent_entitlements_v1_token",
                                  uri='/entitlements/v1/token',
                                  type=("Update",))
         async def onSGPTokenChanged(event):
-            self.sgpToken = event['data']['accessToken']
+            self.sgpTokens.set(event['data']['accessToken'])
+
+        @self.listener.subscribe(event='OnJsonApiEvent_lol-ranked_v1_current-ranked-stats',
+                                 uri='/lol-ranked/v1/current-ranked-stats',
+                                 type=('Create', 'Update'))
+        async def onRankedStatsChanged(event):
+            self.cache.invalidate("/lol-ranked/v1/ranked-stats/")
+            self.cache.invalidate("/lol-ranked/v2/tiers")
 
         # @self.listener.subscribe(event='OnJsonApiEvent', type=())
         # async def onDebugListen(event):
@@ -280,7 +513,33 @@ class LolClientConnector(QObject):
 
         await self.listener.start()
 
+    def __onListenerReconnected(self):
+        self.cache.invalidate("/lol-match-history/v1/products/lol/")
+        self.cache.invalidate("/lol-ranked/v1/ranked-stats/")
+        self.cache.invalidate("/lol-ranked/v2/tiers")
+
     async def close(self):
+        logger.info(f"response cache: {self.cache.stats()}", TAG)
+        logger.info(f"state mirror: {self.mirror.stats()}", TAG)
+        self.mirror.setLive(False)
+
+        try:
+            logger.info(f"websocket: {self.listener.stats()}", TAG)
+        except AttributeError:
+            pass
+
+        if self.limiter:
+            logger.info(f"limiter: {self.limiter.stats()}", TAG)
+
+        logger.info(f"retry: {self.retryStats.summary()}", TAG)
+        logger.info(f"calls: {self.callMetrics.summary()}", TAG)
+        logger.info(f"http: {self.httpMetrics.summary()}", TAG)
+        logger.info(
+            f"upstreams: { {k: v.stats() for k, v in {**self.upstreams, **upstreams}.items()} }", TAG)
+        logger.info(f"http pools: {hub.stats()}", TAG)
+        logger.info(f"assets: {assets.stats()}", TAG)
+        logger.info(f"sgp token: {self.sgpTokens.stats()}", TAG)
+
         try:
             await self.listener.close()
         except:
@@ -292,12 +551,15 @@ class LolClientConnector(QObject):
         if self.sgpSess:
             await self.sgpSess.close()
 
-        self.__init__()
+        self.cache.clear()
+        self.__resetClientState()
 
-    async def __initSessions(self):
-        self.lcuSess = aiohttp.ClientSession(
-            base_url=f'https://127.0.0.1:{self.port}',
-            auth=aiohttp.BasicAuth('riot', self.token)
+    def __initSessions(self):
+        # 每个接口的超时由调用链控制, 这里只是兜底, 避免 aiohttp 默认的 5 分钟
+        self.lcuSess = hub.session(
+            f'https://127.0.0.1:{self.port}',
+            auth=aiohttp.BasicAuth('riot', self.token),
+            timeout=aiohttp.ClientTimeout(total=30, sock_connect=3)
         )
 
         if not self.server:
@@ -308,11 +570,14 @@ class LolClientConnector(QObject):
         else:
             url = f'https://{self.server.lower()}-sgp.lol.qq.com:21019'
 
-        self.sgpSess = aiohttp.ClientSession(
-            base_url=url
+        self.sgpSess = hub.session(
+            url,
+            timeout=aiohttp.ClientTimeout(total=15, sock_connect=3)
         )
 
-        self.sgpToken = await self.getSGPtoken()
+    async def __initSgpToken(self):
+        if self.sgpSess:
+            await self.sgpTokens.refresh()
 
     def __initFolder(self):
         if not os.path.exists("app/resource/game"):
@@ -331,19 +596,113 @@ class LolClientConnector(QObject):
             if not os.path.exists(p):
                 os.mkdir(p)
 
+    async def __initAssets(self):
+        # 扫描本地已有的资源文件, 放到线程里, 不卡界面
+        await asyncio.get_event_loop().run_in_executor(None, assets.load)
+
     async def __initManager(self):
-        items = await self.__json_retry_get("/lol-game-data/assets/v1/items.json")
-        spells = await self.__json_retry_get(
-            "/lol-game-data/assets/v1/summoner-spells.json")
-        runes = await self.__json_retry_get("/lol-game-data/assets/v1/perks.json")
-        perks = await self.__json_retry_get("/lol-game-data/assets/v1/perkstyles.json")
-        queues = await self.__json_retry_get("/lol-game-queues/v1/queues")
-        champions = await self.__json_retry_get(
-            "/lol-game-data/assets/v1/champion-summary.json")
-        skins = await self.__json_retry_get("/lol-game-data/assets/v1/skins.json")
-        augments = await self.__json_retry_get("/lol-game-data/assets/v1/cherry-augments.json")
-
-        self.manager = JsonManager(
+        key = await self.__gameDataKey()
+
+        if key is None:
+            self.manager = await self.__loadManager()
+            return
+
+        manager = self.sharedManagers.get(key)
+
+        if manager is None:
+            # 同时启动的同版本客户端只下载一次
+            manager = await self.managerFlight.do(key, self.__loadManager, key)
+            self.sharedManagers[key] = manager
+        else:
+            logger.info(f"game data shared, version: {key[0]}", TAG)
+
+        self.manager = manager
+
+    async def __gameDataKey(self):
+        """
+        @return: (游戏版本, 语言), 取不到时返回 None, 不与其他客户端共用
+        """
+        try:
+            version, locale = await asyncio.gather(
+                self.__json_retry_get("/lol-patch/v1/game-version"),
+                self.__json_retry_get("/riotclient/region-locale"))
+        except RetryMaximumAttempts:
+            return None
+
+        if not isinstance(version, str) or not isinstance(locale, dict):
+            return None
+
+        return version, locale.get('locale')
+
+    def __snapshotPath(self, key):
+        version, locale = key
+        name = re.sub(r'[^\w.-]', '_', f"{self.server or 'unknown'}-{version}-{locale}")
+
+        return f"{self.SNAPSHOT_FOLDER}/{name}.snapshot"
+
+    async def __loadManager(self, key=None):
+        """
+        版本没变时直接使用上次的快照 (各部分用到时才读取), 否则从客户端下载并处理
+        """
+        if key is not None:
+            path = self.__snapshotPath(key)
+
+            try:
+                manager = JsonManager.fromSnapshot(Snapshot(path))
+            except SnapshotError as e:
+                logger.info(f"game data snapshot unavailable: {e}", TAG)
+                self.snapshotPending = path
+            else:
+                logger.info(f"game data loaded from snapshot, version: {key[0]}", TAG)
+                return manager
+
+        return await self.__downloadManager()
+
+    async def __saveSnapshot(self):
+        path, self.snapshotPending = self.snapshotPending, None
+
+        if path is None:
+            return
+
+        sections = self.manager.toSnapshotSections()
+        meta = {'server': self.server, 'time': time.time()}
+
+        try:
+            # 序列化与压缩放到线程里, 不卡界面
+            await asyncio.get_event_loop().run_in_executor(
+                None, writeSnapshot, path, meta, sections)
+        except OSError as e:
+            logger.warning(f"write game data snapshot failed: {e!r}", TAG)
+            return
+
+        # 同一个大区旧版本的快照不再需要
+        prefix = re.sub(r'[^\w.-]', '_', f"{self.server or 'unknown'}-")
+        for name in os.listdir(self.SNAPSHOT_FOLDER):
+            old = f"{self.SNAPSHOT_FOLDER}/{name}"
+
+            if name.startswith(prefix) and old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+        logger.info(f"game data snapshot saved: {path}", TAG)
+
+    async def __downloadManager(self):
+        # 八份数据互不依赖, 同时请求, 并发数由 limiter 控制
+        items, spells, runes, perks, queues, champions, skins, augments = \
+            await asyncio.gather(*(self.__json_retry_get(url) for url in [
+                "/lol-game-data/assets/v1/items.json",
+                "/lol-game-data/assets/v1/summoner-spells.json",
+                "/lol-game-data/assets/v1/perks.json",
+                "/lol-game-data/assets/v1/perkstyles.json",
+                "/lol-game-queues/v1/queues",
+                "/lol-game-data/assets/v1/champion-summary.json",
+                "/lol-game-data/assets/v1/skins.json",
+                "/lol-game-data/assets/v1/cherry-augments.json",
+            ]))
+
+        return JsonManager(
             items, spells, runes, queues, champions, skins, perks, augments)
 
     def __initPlatformInfo(self):
@@ -354,9 +713,23 @@ class LolClientConnector(QObject):
             self.inMainLand = self.server.lower() in mainlandPlatforms
 
     async def __initRuneStyle(self):
+        styles = self.manager.perks['styles']
+
+        # 先同时下载所有用到的图标, 再组装; 本地已有的图标直接返回
+        # 即使符文数据来自快照或其他客户端, 图标也可能被删掉了, 仍然要检查一遍
+        runeIds = list(dict.fromkeys(
+            [item['id'] for item in styles]
+            + [perk for item in styles for s in item['slots'] for perk in s['perks']]))
+        icons = dict(zip(runeIds, await asyncio.gather(
+            *(self.getRuneIcon(runeId) for runeId in runeIds))))
+
+        # 共用的游戏数据已经由其他客户端整理过了, 或是从快照中读取
+        if self.manager.perkStyles is not None:
+            return
+
         res = {}
 
-        for item in self.manager.perks['styles']:
+        for item in styles:
             id = item['id']
             name = item['name']
 
@@ -365,7 +738,7 @@ class LolClientConnector(QObject):
             for s in item['slots']:
                 perks = [{
                     "runeId": perk,
-                    "icon": await self.getRuneIcon(perk),
+                    "icon": icons[perk],
                     "name": self.manager.getRuneName(perk),
                     "desc": self.manager.getRuneDesc(perk),
                 } for perk in s['perks']
@@ -375,7 +748,7 @@ class LolClientConnector(QObject):
 
             res[id] = {
                 "name": name,
-                "icon": await self.getRuneIcon(id),
+                "icon": icons[id],
                 "slots": slots
             }
 
@@ -385,62 +758,60 @@ class LolClientConnector(QObject):
         """
         根据 httpStatus 字段值, retry 获取数据
 
-        用于软件初始化阶段
+        用于软件初始化阶段, 客户端刚打开时 Service 可能还没准备好,
+        重试之间异步等待, 不阻塞界面
 
         @param url:
         @param max_retries:
         @return: json
         @rtype: dict
         """
-        retries = 0
-        while retries < max_retries:
-            try:
-                result = await self.__get(url)
-                result = await result.json()
-
-            # 客户端刚打开, Service 正在初始化
-            # 有部分请求可能会 ConnectionError, 直接忽略重试
-            except aiohttp.ClientConnectorError:
-                retries += 1
-                time.sleep(.5)
-                continue
-
-            if type(result) is list:
-                return result
+        async def attempt():
+            result = await self.__get(url)
+            result = await result.json()
 
             # 如果有才判定, 有部分相应成功时没有 httpStatus
-            elif result.get("httpStatus") and result.get("httpStatus") != 200:
-                time.sleep(.5)
-                retries += 1
-            else:
-                return result
+            if type(result) is dict and result.get("httpStatus") and result.get("httpStatus") != 200:
+                raise ReferenceError()
 
-        # 最大重试次数, 抛异常
-        raise RetryMaximumAttempts("Exceeded maximum retry attempts.")
+            return result
 
-    @retry()
-    async def getRuneIcon(self, runeId):
-        if runeId == 0:
-            return "app/resource/images/rune-0.png"
+        # 客户端刚打开, 有部分请求可能会 ConnectionError 或响应很慢 (超时), 直接忽略重试
+        retryOn = (aiohttp.ClientConnectorError, ReferenceError, CircuitOpen,
+                   asyncio.TimeoutError)
+        policy = RetryPolicy(max_retries, .5, giveUpOn=(), retryOn=retryOn)
 
-        icon = f"app/resource/game/rune icons/{runeId}.png"
-        if not os.path.exists(icon):
-            path = self.manager.getRuneIconPath(runeId)
-            res = await self.__get(path)
+        try:
+            return await callWithRetry(policy, self.retryStats, "initManager", attempt)
+        except (*retryOn, DeadlineExceeded):
+            # 最大重试次数, 抛异常
+            raise RetryMaximumAttempts("Exceeded maximum retry attempts.")
 
-            with open(icon, "wb") as f:
-                f.write(await res.read())
+    async def getRuneIcon(self, runeId):
+        icon = runeIconPath(runeId)
 
-        return icon
+        if runeId == 0 or icon in assets:
+            return icon
+
+        return await self.__fetchAsset(icon, self.manager.getRuneIconPath(runeId))
 
     @retry()
     async def getCurrentSummoner(self):
-        res = await self.__get("/lol-summoner/v1/current-summoner")
+        uri = "/lol-summoner/v1/current-summoner"
+
+        res = self.mirror.get(uri)
+        if res is not None:
+            return res
+
+        version = self.mirror.versionOf(uri)
+        res = await self.__get(uri)
         res = await res.json()
 
         if not "summonerId" in res:
             raise ReferenceError()
 
+        self.mirror.seed(uri, res, version)
+
         return res
 
     @retry()
@@ -448,49 +819,34 @@ class LolClientConnector(QObject):
         res = await self.__get("/data-store/v1/install-dir")
         return await res.json()
 
-    @retry()
+    # 以下获取图标、原画的接口: 本地已有时直接返回, 不经过重试等调用链, 也不会让出事件循环;
+    # 只有需要下载时才走 __fetchAsset
+
     async def getProfileIcon(self, iconId):
         icon = f"./app/resource/game/profile icons/{iconId}.jpg"
 
-        if not os.path.exists(icon):
-            path = self.manager.getSummonerProfileIconPath(iconId)
-            res = await self.__get(path)
-
-            with open(icon, "wb") as f:
-                f.write(await res.read())
+        if icon in assets:
+            return icon
 
-        return icon
+        return await self.__fetchAsset(
+            icon, self.manager.getSummonerProfileIconPath(iconId))
 
-    @retry()
     async def getItemIcon(self, iconId):
-        if iconId == 0:
-            return "app/resource/images/item-0.png"
+        icon = itemIconPath(iconId)
 
-        icon = f"app/resource/game/item icons/{iconId}.png"
+        if iconId == 0 or icon in assets:
+            return icon
 
-        if not os.path.exists(icon):
-            path = self.manager.getItemIconPath(iconId)
-            res = await self.__get(path)
+        return await self.__fetchAsset(icon, self.manager.getItemIconPath(iconId))
 
-            with open(icon, "wb") as f:
-                f.write(await res.read())
-
-        return icon
-
-    @retry()
     async def getAugmentIcon(self, augmentId):
         icon = f"app/resource/game/augment icons/{augmentId}.png"
 
-        if not os.path.exists(icon):
-            path = self.manager.getAugmentsIconPath(augmentId)
-            res = await self.__get(path)
+        if icon in assets:
+            return icon
 
-            with open(icon, "wb") as f:
-                f.write(await res.read())
+        return await self.__fetchAsset(icon, self.manager.getAugmentsIconPath(augmentId))
 
-        return icon
-
-    @retry()
     async def getChampionSplashes(self, skinInfo, isCentered: bool):
         """
         :param skinInfo:
@@ -515,28 +871,19 @@ class LolClientConnector(QObject):
             image = f"app/resource/game/splashes/{splashesId}_uncentered.jpg"
             url = skinInfo["uncenteredSplashPath"]
 
-        if not os.path.exists(image):
-            res = await self.__get(url)
-
-            with open(image, "wb") as f:
-                f.write(await res.read())
+        if image in assets:
+            return image
 
-        return image
+        return await self.__fetchAsset(image, url)
 
-    @retry()
     async def getSummonerSpellIcon(self, spellId):
-        icon = f"app/resource/game/summoner spell icons/{spellId}.png"
-
-        if not os.path.exists(icon):
-            path = self.manager.getSummonerSpellIconPath(spellId)
-            res = await self.__get(path)
+        icon = summonerSpellIconPath(spellId)
 
-            with open(icon, "wb") as f:
-                f.write(await res.read())
+        if icon in assets:
+            return icon
 
-        return icon
+        return await self.__fetchAsset(icon, self.manager.getSummonerSpellIconPath(spellId))
 
-    @retry()
     async def getChampionIcon(self, championId) -> str:
         """
         @param championId:
@@ -544,19 +891,22 @@ class LolClientConnector(QObject):
         @rtype: str
         """
 
-        if championId in [-1, 0]:
-            return "app/resource/images/champion-0.png"
+        icon = championIconPath(championId)
 
-        icon = f"app/resource/game/champion icons/{championId}.png"
+        if championId in [-1, 0] or icon in assets:
+            return icon
 
-        if not os.path.exists(icon):
-            path = self.manager.getChampionIconPath(championId)
-            res = await self.__get(path)
+        return await self.__fetchAsset(icon, self.manager.getChampionIconPath(championId))
 
-            with open(icon, "wb") as f:
-                f.write(await res.read())
+    @retry()
+    async def __fetchAsset(self, local, path):
+        """
+        下载本地还没有的资源文件
 
-        return icon
+        @return: 本地路径
+        """
+        await self.__download(local, path)
+        return local
 
     @retry()
     async def getSummonerByName(self, name):
@@ -647,6 +997,56 @@ class LolClientConnector(QObject):
 
         return res
 
+    async def getRankedTiersByPuuids(self, puuids, withLp=False):
+        """
+        批量获取召唤师各个队列的 段位 / 小段, 一次 `/lol-ranked/v2/tiers` 请求最多查 `BATCH_SIZE` 个召唤师;
+        需要胜负场、历史最高段位等完整数据时 (生涯界面) 使用 `getRankedStatsByPuuid`
+
+        批量接口不带胜点; 界面要显示胜点时传 `withLp=True`, 再为有段位的召唤师查 ranked-stats 补上
+        (斗魂竞技场为积分). 客户端不支持批量接口时也退回到 ranked-stats
+
+        @return: {puuid: {queueType: {'tier': str, 'division': str, 'lp': int | ''}}},
+                 查不到的不在其中
+        """
+        puuids = list(dict.fromkeys(
+            p for p in puuids if p and p != "00000000-0000-0000-0000-000000000000"))
+        res = {}
+
+        # 需要再查 ranked-stats 的召唤师
+        detailed = []
+
+        for i in range(0, len(puuids), self.BATCH_SIZE):
+            chunk = puuids[i:i + self.BATCH_SIZE]
+
+            items = await self.__get("/lol-ranked/v2/tiers", {"puuids": dumps(chunk)})
+            items = await items.json()
+
+            if type(items) is not list:
+                detailed.extend(chunk)
+                continue
+
+            for item in items:
+                if 'puuid' in item:
+                    res[item['puuid']] = compactRankedTiers(item.get('achievedTiers', []))
+
+        if withLp:
+            # 没有段位的召唤师没有胜点可显示
+            detailed.extend(puuid for puuid, tiers in res.items()
+                            if 'CHERRY' in tiers or any(t['tier'] for t in tiers.values()))
+
+        results = await asyncio.gather(
+            *[self.getRankedStatsByPuuid(puuid) for puuid in detailed],
+            return_exceptions=True)
+
+        for puuid, stats in zip(detailed, results):
+            if isinstance(stats, (asyncio.CancelledError, DeadlineExceeded)):
+                raise stats
+
+            if isinstance(stats, dict):
+                res[puuid] = compactRankedStats(stats)
+
+        return res
+
     @retry()
     async def setProfileBackground(self, skinId):
         data = {
@@ -789,13 +1189,38 @@ class LolClientConnector(QObject):
         # FIXME
         # 若刚进行完一场对局, 随后开启一盘自定义, 玩家在红色方且蓝色方没人时,
         # 该接口会返回上一局中蓝色方的队员信息 (teamOne or teamTwo)
-        res = await self.__get("/lol-gameflow/v1/session")
-        return await res.json()
+        uri = "/lol-gameflow/v1/session"
+
+        # 阶段变化与 session 变化是两个事件, 阶段对不上说明 session 的事件还没到
+        res = self.mirror.get(uri)
+        if res is not None and res.get('phase') == self.mirror.get("/lol-gameflow/v1/gameflow-phase"):
+            return res
+
+        version = self.mirror.versionOf(uri)
+        res = await self.__get(uri)
+        res = await res.json()
+
+        if not res.get('errorCode'):
+            self.mirror.seed(uri, res, version)
+
+        return res
 
     @retry()
     async def getChampSelectSession(self):
-        res = await self.__get("/lol-champ-select/v1/session")
-        return await res.json()
+        uri = "/lol-champ-select/v1/session"
+
+        res = self.mirror.get(uri)
+        if res is not None:
+            return res
+
+        version = self.mirror.versionOf(uri)
+        res = await self.__get(uri)
+        res = await res.json()
+
+        if not res.get('errorCode'):
+            self.mirror.seed(uri, res, version)
+
+        return res
 
     # 同意交换
     @retry()
@@ -884,25 +1309,144 @@ class LolClientConnector(QObject):
 
         return await res.json()
 
+    async def getSummonersByIds(self, summonerIds):
+        """
+        批量获取召唤师信息, 一次请求最多 `BATCH_SIZE` 个
+
+        结果会写入 `getSummonerById` 与 `getSummonerByPuuid` 的缓存,
+        之后对这些召唤师的单个查询不会再发请求
+
+        本身不重试: 批量请求失败或客户端不支持时退回到逐个查询, 由单个查询各自重试
+
+        @return: {summonerId: summoner}, 查不到的不在其中
+        """
+        ids = list(dict.fromkeys(id for id in summonerIds if id))
+        res = {}
+
+        for i in range(0, len(ids), self.BATCH_SIZE):
+            chunk = ids[i:i + self.BATCH_SIZE]
+
+            summoners = await self.__batch(
+                lambda: self.__get("/lol-summoner/v2/summoners", {"ids": dumps(chunk)}),
+                self.getSummonerById, chunk)
+
+            for summoner in summoners:
+                if "summonerId" in summoner:
+                    self.__feedSummonerCache(summoner)
+                    res[summoner["summonerId"]] = summoner
+
+        return res
+
+    async def getSummonersByPuuids(self, puuids):
+        """
+        同 `getSummonersByIds`, 按 puuid 批量查询
+
+        @return: {puuid: summoner}, 查不到的不在其中
+        """
+        puuids = list(dict.fromkeys(
+            p for p in puuids if p and p != "00000000-0000-0000-0000-000000000000"))
+        res = {}
+
+        for i in range(0, len(puuids), self.BATCH_SIZE):
+            chunk = puuids[i:i + self.BATCH_SIZE]
+
+            summoners = await self.__batch(
+                lambda: self.__post("/lol-summoner/v2/summoners/puuid", data=chunk),
+                self.getSummonerByPuuid, chunk)
+
+            for summoner in summoners:
+                if "puuid" in summoner:
+                    self.__feedSummonerCache(summoner)
+                    res[summoner["puuid"]] = summoner
+
+        return res
+
+    @staticmethod
+    async def __batch(request, lookup, keys):
+        """
+        @param request: 发出批量请求, 返回 response
+        @param lookup: 单个查询, 批量请求失败或返回的不是列表 (客户端不支持) 时对每个 key 调用
+        @return: 召唤师列表, 逐个查询时查不到 (如 SummonerNotFound) 的直接跳过
+        """
+        try:
+            summoners = await (await request()).json()
+        except (asyncio.CancelledError, DeadlineExceeded, ClientNotConnected):
+            raise
+        except BaseException as e:
+            logger.warning(f"batch summoner lookup failed: {e!r}", TAG)
+            summoners = None
+
+        if type(summoners) is list:
+            return summoners
+
+        results = await asyncio.gather(*[lookup(key) for key in keys],
+                                       return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, (asyncio.CancelledError, DeadlineExceeded)):
+                raise result
+
+        return [result for result in results if isinstance(result, dict)]
+
+    def __feedSummonerCache(self, summoner):
+        body = dumps(summoner).encode('utf-8')
+
+        for path in (f"/lol-summoner/v1/summoners/{summoner.get('summonerId')}",
+                     f"/lol-summoner/v2/summoners/puuid/{summoner.get('puuid')}"):
+            policy = self.cache.match(path)
+
+            if policy:
+                # 与不带参数的 GET 请求的 key 保持一致
+                self.cache.put((path, None), path,
+                               CachedResponse(200, body), policy)
+
     # @retry()
     async def getGameStatus(self):
-        res = await self.__get("/lol-gameflow/v1/gameflow-phase")
-        res = await res.text()
+        uri = "/lol-gameflow/v1/gameflow-phase"
+
+        res = self.mirror.get(uri)
+        if res is not None:
+            return res
+
+        version = self.mirror.versionOf(uri)
+        res = await self.__get(uri)
+        res = (await res.text())[1:-1]
+
+        self.mirror.seed(uri, res, version)
 
-        return res[1:-1]
+        return res
 
     @retry()
     async def getMapSide(self):
-        res = await self.__get("/lol-champ-select/v1/pin-drop-notification")
-        res = await res.json()
+        uri = "/lol-champ-select/v1/pin-drop-notification"
+
+        res = self.mirror.get(uri)
+        if res is None:
+            version = self.mirror.versionOf(uri)
+            res = await self.__get(uri)
+            res = await res.json()
+
+            if not res.get('errorCode'):
+                self.mirror.seed(uri, res, version)
 
         return res.get("mapSide", "")
 
     @retry()
     async def getReadyCheckStatus(self):
-        res = await self.__get("/lol-matchmaking/v1/ready-check")
+        uri = "/lol-matchmaking/v1/ready-check"
 
-        return await res.json()
+        res = self.mirror.get(uri)
+        if res is not None:
+            return res
+
+        version = self.mirror.versionOf(uri)
+        res = await self.__get(uri)
+        res = await res.json()
+
+        if not res.get("errorCode"):
+            self.mirror.seed(uri, res, version)
+
+        return res
 
     @retry()
     async def getCurrentRunePage(self):
@@ -1096,35 +1640,163 @@ class LolClientConnector(QObject):
     def isInMainland(self):
         return self.inMainLand
 
-    @needLcu()
+    def isSGPAvailable(self):
+        """
+        国服且 SGP 没有被熔断, 熔断期间直接走 LCU, 不再每次都先试一遍 SGP
+        """
+        return self.inMainLand and self.upstreams['sgp'].available()
+
+    async def __download(self, local, path):
+        """
+        将 LCU 上的资源文件下载到本地
+
+        同一个文件同时只会被下载、写入一次, 其余调用者等待这次下载完成
+        """
+        await self.assetFlight.do(local, self.__doDownload, local, path)
+
+    async def __doDownload(self, local, path):
+        # 等待期间可能已经有别人下载好了, 或是索引建立之后文件才出现
+        if os.path.exists(local):
+            assets.add(local)
+            return
+
+        res = await self.__get(path)
+        data = await res.read()
+
+        with open(local, "wb") as f:
+            f.write(data)
+
+        assets.add(local)
+
+    def __initPipelines(self):
+        """
+        组合 HTTP 请求的中间件调用链
+
+        LCU GET:   鉴权 -> 缓存 -> 截止时间 -> 合并 -> 统计 -> 并发限制 -> 限速熔断 -> 超时 -> 发送
+        LCU 其他:  鉴权 -> 截止时间 -> 统计 -> 并发限制 -> 限速熔断 -> 超时 -> 发送
+        SGP GET:   鉴权 -> 截止时间 -> 合并 -> 统计 -> 限速熔断 -> 超时 -> 发送
+
+        截止时间只看调用者的 `deadline()`, 包括排队的时间; 每个接口的超时只计算发出之后的时间;
+        超时在限速熔断之内, 上游卡住时超时会被记为失败, 连续超时后熔断
+        """
+        flight = singleFlightMiddleware(self.requestFlight, self.__flightKey)
+        metrics = metricsMiddleware(lambda req: self.httpMetrics,
+                                    lambda req: f"{req.upstream} {req.method}")
+        guard = upstreamMiddleware(lambda req: self.upstreams[req.upstream])
+        deadline = deadlineMiddleware()
+        timeout = timeoutMiddleware(
+            lambda req: LCU_TIMEOUTS if req.upstream == "lcu" else SGP_TIMEOUTS)
+
+        self.lcuGetChain = compose(
+            [self.__lcuAuth, self.__cacheLookup, deadline, flight, metrics, self.__limit,
+             guard, timeout], self.__send)
+        self.lcuChain = compose(
+            [self.__lcuAuth, deadline, metrics, self.__limit, guard, timeout], self.__send)
+        self.sgpGetChain = compose(
+            [self.__sgpAuth, deadline, flight, metrics, guard, timeout], self.__send)
+
+    async def __lcuAuth(self, req: Request, next):
+        # 没有连接客户端
+        if self.lcuSess is None:
+            raise ClientNotConnected
+
+        return await next(req)
+
+    async def __sgpAuth(self, req: Request, next):
+        assert self.inMainLand
+
+        token = await self.sgpTokens.get()
+        req.headers = {"Authorization": f"Bearer {token}"}
+
+        res = await next(req)
+
+        if res.status != 401:
+            return res
+
+        # token 过期或被吊销, 换一个新的重放一次
+        token = await self.sgpTokens.refresh(stale=token)
+        req.headers = {"Authorization": f"Bearer {token}"}
+
+        return await next(req)
+
+    async def __cacheLookup(self, req: Request, next):
+        req.policy = self.cache.match(req.path)
+
+        if req.policy is None:
+            return await next(req)
+
+        res = self.cache.get(req.key)
+
+        if res is not None:
+            return res
+
+        res = await next(req)
+
+        # 合并的调用者拿到的是同一个 response, 重复写入是一样的
+        if res.status == 200:
+            body = await res.read()
+            self.cache.put(req.key, req.path,
+                           CachedResponse(res.status, body), req.policy)
+
+        return res
+
+    @staticmethod
+    def __flightKey(req: Request):
+        # 后台请求单独合并, 避免用户操作触发的请求搭上后台请求的车, 跟着一起排队
+        return (req.upstream, req.key, currentPriority.get() == Priority.BACKGROUND)
+
+    async def __limit(self, req: Request, next):
+        async with self.limiter.slot() as slot:
+            res = await next(req)
+            slot.status = res.status
+
+        if res.status == 429 and req.method == "GET":
+            raise RateLimited(self.__parseRetryAfter(res))
+
+        return res
+
+    async def __send(self, req: Request):
+        sess = self.lcuSess if req.upstream == "lcu" else self.sgpSess
+
+        res = await sess.request(req.method, req.path, params=req.params,
+                                 json=req.data, headers=req.headers, ssl=False)
+
+        # 合并后的 response 会被多个调用者读取, 先把 body 读出来,
+        # 之后的 .json() / .read() / .text() 都直接使用缓存的 body
+        if req.method == "GET":
+            await res.read()
+
+        return res
+
+    @staticmethod
+    def __parseRetryAfter(res):
+        value = res.headers.get("Retry-After")
+
+        try:
+            return max(0., float(value))
+        except (TypeError, ValueError):
+            # 没有或是 HTTP 日期格式的, 交给退避策略决定
+            return None
+
     async def __get(self, path, params=None):
-        return await self.lcuSess.get(path, params=params, ssl=False)
+        return await self.lcuGetChain(Request("lcu", "GET", path, params))
 
-    @needLcu()
     async def __post(self, path, data=None):
         headers = {"Content-type": "application/json"}
-        return await self.lcuSess.post(path, json=data, headers=headers, ssl=False)
 
-    @needLcu()
+        return await self.lcuChain(Request("lcu", "POST", path, data=data, headers=headers))
+
     async def __put(self, path, data=None):
-        return await self.lcuSess.put(path, json=data, ssl=False)
+        return await self.lcuChain(Request("lcu", "PUT", path, data=data))
 
-    @needLcu()
     async def __delete(self, path):
-        return await self.lcuSess.delete(path, ssl=False)
+        return await self.lcuChain(Request("lcu", "DELETE", path))
 
-    @needLcu()
     async def __patch(self, path, data=None):
-        return await self.lcuSess.patch(path, json=data, ssl=False)
+        return await self.lcuChain(Request("lcu", "PATCH", path, data=data))
 
     async def __sgp__get(self, path, params=None):
-        assert self.inMainLand
-
-        headers = {
-            "Authorization": f"Bearer {self.sgpToken}"
-        }
-
-        return await self.sgpSess.get(path, params=params, ssl=False, headers=headers)
+        return await self.sgpGetChain(Request("sgp", "GET", path, params))
 
     def getLoginSummonerByPid(self, pid):
         port, token, _ = getPortTokenServerByPid(pid)
@@ -1133,25 +1805,23 @@ class LolClientConnector(QObject):
 
 
 class JsonManager:
+    # 可以写入快照的部分; 以 int 为 key 的 dict 在 JSON 中存成 [[key, value], ...]
+    SECTIONS = ('items', 'spells', 'runes', 'champs', 'champions', 'queues',
+                'perks', 'perkStyles', 'skinAugments', 'cherryAugments')
+    INT_KEYED = {'items', 'spells', 'runes', 'champs', 'queues',
+                 'perkStyles', 'skinAugments', 'cherryAugments'}
+
     def __init__(self, itemData, spellData, runeData, queueData, champions, skins, perks, augments):
+        self.snapshot = None
+
         self.items = {item["id"]: item["iconPath"] for item in itemData}
         self.spells = {item["id"]: item["iconPath"] for item in spellData[:-3]}
         self.runes = {item["id"]: {"icon": item["iconPath"],
                                    'name': item['name'],
-                                   'desc': item['longDesc']
+                                   'desc': cleanRuneDesc(item['longDesc'])
                                    } for item in runeData}
 
-        for item in self.runes.values():
-            desc: str = item['desc']
-
-            # 移除除了 <br>、<i>、</i>、<font color='xxx'> 和 </font> 以外的所有 html 标签
-            partten = r"(?!<br\s*/?>|<i>|</i>|<b>|</b>|<font color='[^']+'>|</font>)(<[^>]+>)"
-            desc = re.sub(partten, '', desc)
-
-            # 移除末尾多余的换行
-            item['desc'] = desc.strip().strip("<br>")
-
-        self.champs = {item["id"]: item["name"] for item in champions}
+        self.champs = {item["id"]: sys.intern(item["name"]) for item in champions}
 
         self.champions = {item: {"skins": {}} for item in self.champs.values()}
         self.queues = {
@@ -1199,6 +1869,61 @@ class JsonManager:
             item['id']: item
             for item in augments}
 
+    @classmethod
+    def fromSnapshot(cls, snapshot: Snapshot):
+        """
+        各部分在第一次访问时才从快照中读取; 快照在打开时已经校验过,
+        这里再检查各部分是否齐全, 缺少时抛 SnapshotError, 由调用者改为从客户端下载
+        """
+        missing = [name for name in cls.SECTIONS if name not in snapshot.sections]
+        if missing:
+            raise SnapshotError(f"{snapshot.path}: missing sections {missing}")
+
+        manager = cls.__new__(cls)
+        manager.snapshot = snapshot
+
+        return manager
+
+    def __getattr__(self, name):
+        # 只有从快照创建、且这部分还没读取时才会走到这里
+        snapshot = self.__dict__.get('snapshot')
+
+        if snapshot is None or name not in snapshot.sections:
+            raise AttributeError(name)
+
+        value = snapshot.section(name)
+        if name in self.INT_KEYED and value is not None:
+            value = {key: item for key, item in value}
+
+        setattr(self, name, value)
+        return value
+
+    def toSnapshotSections(self):
+        sections = {}
+
+        for name in self.SECTIONS:
+            value = getattr(self, name)
+
+            if name in self.INT_KEYED and value is not None:
+                value = list(value.items())
+
+            sections[name] = value
+
+        return sections
+
+    # 以下索引由上面的数据推导, 不写入快照, 第一次用到时才建立
+    @cached_property
+    def championIds(self):
+        return buildChampionIds(self.champs)
+
+    @cached_property
+    def runeIcons(self):
+        return buildRuneIcons(self.runes, self.perks['styles'])
+
+    @cached_property
+    def skinLists(self):
+        return buildSkinLists(self.champions, self.skinAugments)
+
     def getItemIconPath(self, iconId):
         if iconId != 0:
             try:
@@ -1215,12 +1940,7 @@ class JsonManager:
             return "/lol-game-data/assets/data/spells/icons2d/summoner_empty.png"
 
     def getRuneIconPath(self, runeId):
-        try:
-            return self.runes[runeId]['icon']
-        except:
-            for item in self.perks['styles']:
-                if item['id'] == runeId:
-                    return item['iconPath']
+        return self.runeIcons.get(runeId)
 
     def getRuneName(self, runeId):
         return self.runes[runeId]['name']
@@ -1235,39 +1955,30 @@ class JsonManager:
         return f"/lol-game-data/assets/v1/champion-icons/{championId}.png"
 
     def getMapNameById(self, mapId):
-        maps = {
-            -1: ("特殊地图", "Special map"),
-            11: ("召唤师峡谷", "Summoner's Rift"),
-            12: ("嚎哭深渊", "Howling Abyss"),
-            21: ("极限闪击", "Nexus Blitz"),
-            30: ("斗魂竞技场", "Arena"),
-        }
-
-        key = mapId if mapId in maps else -1
-        index = 1 if cfg.language.value == Language.ENGLISH else 0
-
-        return maps[key][index]
+        return localization().mapName(mapId)
 
     def getNameMapByQueueId(self, queueId):
-        if queueId == 0:
-            return {
-                "name": "Custom" if cfg.language.value == Language.ENGLISH else "自定义"
-            }
-
-        data = self.queues[queueId]
-        mapId = data["mapId"]
-        name = data["name"]
+        """
+        @return: {"map", "name"}, 只读; 同一语言下每次返回同一个对象
+        """
+        return self.__queueNames()[queueId]
 
-        if cfg.language.value == Language.ENGLISH:
-            with open("app/resource/i18n/gamemodes.json", encoding="utf-8") as f:
-                translate = json.loads(f.read())
+    def __queueNames(self):
+        # 按语言缓存所有模式的名字, 语言改变后重建
+        texts = localization()
+        cached = getattr(self, 'queueNames', None)
 
-                if name in translate:
-                    name = translate[name]
+        if cached is not None and cached[0] is texts:
+            return cached[1]
 
-        map = self.getMapNameById(mapId)
+        table = {queueId: MappingProxyType({
+            "map": texts.mapName(data["mapId"]),
+            "name": texts.modeName(data["name"]),
+        }) for queueId, data in self.queues.items()}
+        table[0] = MappingProxyType({"name": texts.custom})
 
-        return {"map": map, "name": name}
+        self.queueNames = (texts, table)
+        return table
 
     def getMapIconByMapId(self, mapId, win):
         result = "victory" if win else "defeat"
@@ -1292,21 +2003,19 @@ class JsonManager:
         return self.champs
 
     def getSkinListByChampionName(self, championName):
-        try:
-            return [item for item in self.champions[championName]["skins"].items()]
-        except:
-            return []
+        """
+        @return: [(皮肤名, SkinRecord)], 建好的列表, 不要修改
+        """
+        return self.skinLists.get(championName, [])
 
     def getSkinIdByChampionAndSkinName(self, championName, skinName):
         return self.champions[championName]["skins"][skinName]["skinId"]
 
     def getChampionIdByName(self, championName):
-        return self.champions[championName]["id"]
+        return self.championIds[championName]
 
     def getChampionNameById(self, championId):
-        for cid in self.champs.keys():
-            if cid == championId:
-                return self.champs[cid]
+        return self.champs.get(championId)
 
     def getSkinAugments(self, skinId):
         return self.skinAugments.get(skinId)
@@ -1325,4 +2034,160 @@ class JsonManager:
         return self.cherryAugments[augmentId]['nameTRA']
 
 
-connector = LolClientConnector()
+
+class ConnectorPool:
+    """
+    多开客户端时, 每个客户端 (pid) 各自一个 `LolClientConnector`
+
+    所有客户端都保持连接 (session、websocket、状态镜像), 切换客户端只是改变界面绑定的实例,
+    不用关闭重连、重新下载游戏数据; 只有当前绑定的实例会发出 signalBus 的信号
+    """
+
+    def __init__(self):
+        # pid -> LolClientConnector
+        self.connectors = {}
+
+        # pid -> 正在进行的 start
+        self.starting = {}
+
+        # 没有客户端时界面绑定的实例, 与之前 close 之后的 connector 一样, 请求抛 ClientNotConnected
+        self.idle = LolClientConnector()
+        self.active = self.idle
+        self.idle.isActive = True
+
+    async def activate(self, pid) -> LolClientConnector:
+        """
+        界面切换到 `pid` 对应的客户端, 没有保温的话先启动
+
+        启动失败时把它移出连接池并抛出异常
+        """
+        conn = self.connectors.get(pid)
+        warmed = conn is not None
+
+        if conn is None:
+            conn = self.__create(pid)
+
+        self.__bind(conn)
+        await self.__waitStarted(pid, conn)
+
+        # 读取不到客户端的启动参数; 后台启动时没有提示过, 这里补上
+        if conn.port is None:
+            await self.release(pid)
+
+            if warmed:
+                signalBus.getCmdlineError.emit()
+
+        return conn
+
+    def warm(self, pid):
+        """
+        在后台启动 `pid` 对应的客户端, 切换过去时不用等待
+        """
+        if pid not in self.connectors:
+            self.__create(pid)
+
+    async def sync(self, pids):
+        """
+        与正在运行的客户端保持一致: 新打开的在后台启动, 已经关掉的释放
+        """
+        for pid in list(self.connectors):
+            if pid not in pids:
+                await self.release(pid)
+
+        for pid in pids:
+            self.warm(pid)
+
+    async def release(self, pid):
+        conn = self.connectors.pop(pid, None)
+
+        if conn is None:
+            return
+
+        task = self.starting.pop(pid, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+        if conn is self.active:
+            self.__bind(self.idle)
+
+        await conn.close()
+
+    async def closeAll(self):
+        for pid in list(self.connectors):
+            await self.release(pid)
+
+    def __create(self, pid):
+        conn = self.connectors[pid] = LolClientConnector()
+
+        task = self.starting[pid] = asyncio.ensure_future(conn.start(pid))
+        task.add_done_callback(lambda t: self.__onStarted(pid, t))
+
+        return conn
+
+    def __onStarted(self, pid, task):
+        if self.starting.get(pid) is task:
+            del self.starting[pid]
+
+        if task.cancelled():
+            return
+
+        # 取走异常, 当前绑定的实例由 activate 处理
+        exce = task.exception()
+        conn = self.connectors.get(pid)
+
+        if conn is None or conn.isActive:
+            return
+
+        # 后台启动失败 (包括命令行读取失败) 时直接移出, 切换过去时会重新启动
+        if exce is not None or conn.port is None:
+            logger.warning(f"warm up failed, pid: {pid}, {exce!r}", TAG)
+            del self.connectors[pid]
+            asyncio.ensure_future(conn.close())
+
+    async def __waitStarted(self, pid, conn):
+        task = self.starting.get(pid)
+
+        if task is None:
+            return
+
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            if self.connectors.get(pid) is conn:
+                await self.release(pid)
+
+            raise
+
+    def __bind(self, conn: LolClientConnector):
+        self.active.isActive = False
+        conn.isActive = True
+        self.active = conn
+
+    def stats(self):
+        return {
+            'connectors': list(self.connectors),
+            'active': getattr(self.active, 'pid', None),
+            'starting': list(self.starting),
+            'sharedManagers': len(LolClientConnector.sharedManagers),
+        }
+
+
+class ActiveConnector:
+    """
+    界面使用的 `connector`, 所有属性都转发给连接池当前绑定的实例
+    """
+
+    def __init__(self, pool: ConnectorPool):
+        object.__setattr__(self, 'pool', pool)
+
+    def __getattr__(self, name):
+        return getattr(self.pool.active, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.pool.active, name, value)
+
+
+connectorPool = ConnectorPool()
+connector = ActiveConnector(connectorPool)
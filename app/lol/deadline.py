@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import re
+import time
+from contextlib import contextmanager
+
+from app.lol.exceptions import DeadlineExceeded
+
+
+# 当前这条流水线必须完成的时间点 (time.monotonic()), None 表示不限;
+# 与 `scheduler.currentPriority` 一样随 asyncio 的 context 传递到子任务中
+currentDeadline = contextvars.ContextVar("requestDeadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    为接下来的调用设置截止时间, 嵌套时取更早的那个
+
+    用法:
+
+        with deadline(15):
+            game = await connector.getGameDetailByGameId(gameId)
+    """
+    new = time.monotonic() + seconds
+    old = currentDeadline.get()
+
+    token = currentDeadline.set(new if old is None else min(old, new))
+
+    try:
+        yield
+    finally:
+        currentDeadline.reset(token)
+
+
+def remaining():
+    """
+    距离截止时间还有多少秒, 没有截止时间时返回 None
+    """
+    at = currentDeadline.get()
+
+    if at is None:
+        return None
+
+    return at - time.monotonic()
+
+
+def checkDeadline():
+    """
+    已经过了截止时间的话直接抛 `DeadlineExceeded`, 不再继续做没人要的工作
+    """
+    left = remaining()
+
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+class EndpointTimeouts:
+    def __init__(self, rules, default):
+        """
+        @param rules: [(匹配 path 的正则, 超时秒数)], 按顺序匹配
+        @param default: 没有匹配到时使用的超时秒数
+        """
+        self.rules = [(re.compile(pattern), seconds)
+                      for pattern, seconds in rules]
+        self.default = default
+
+    def match(self, path):
+        for pattern, seconds in self.rules:
+            if pattern.match(path):
+                return seconds
+
+        return self.default
+
+
+LCU_TIMEOUTS = EndpointTimeouts([
+    # 资源文件与初始化时的大 json
+    (r"^/lol-game-data/assets/", 20),
+    (r"^/lol-game-queues/", 20),
+
+    (r"^/lol-match-history/", 10),
+    (r"^/lol-ranked/", 8),
+    (r"^/lol-summoner/", 5),
+    (r"^/lol-gameflow/", 5),
+    (r"^/lol-champ-select/", 5),
+], 10)
+
+SGP_TIMEOUTS = EndpointTimeouts([
+    (r"^/match-history-query/", 8),
+], 5)
+
+
+def deadlineMiddleware():
+    """
+    HTTP 调用链中的截止时间控制, 放在排队 (合并、并发限制) 之前
+
+    只用调用者的截止时间 (`deadline()`) 限制整个请求, 包括排队等待的时间;
+    没有截止时间时不限, 发送本身的超时由 `timeoutMiddleware` 控制.
+    已经过了截止时间的请求直接丢弃, 不再占用并发名额
+    """
+    async def middleware(req, next):
+        left = remaining()
+
+        if left is None:
+            return await next(req)
+
+        if left <= 0:
+            raise DeadlineExceeded()
+
+        try:
+            return await asyncio.wait_for(next(req), left)
+        except asyncio.TimeoutError:
+            checkDeadline()
+            raise
+
+    return middleware
+
+
+def timeoutMiddleware(getTimeouts):
+    """
+    HTTP 调用链中每个接口的超时, 放在并发限制与限速熔断之内, 只计算请求真正发出之后的时间;
+    在并发限制中排队的时间不计入, 否则排队久了请求还没发出就超时, 重试又会加重负载
+
+    实际超时取接口默认超时与流水线剩余时间中较短的一个
+
+    @param getTimeouts: (req) -> EndpointTimeouts
+    """
+    async def middleware(req, next):
+        timeout = getTimeouts(req).match(req.path)
+        left = remaining()
+
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded()
+
+            timeout = min(timeout, left)
+
+        try:
+            return await asyncio.wait_for(next(req), timeout)
+        except asyncio.TimeoutError:
+            # 是被流水线的截止时间截断的, 重试也没有意义
+            checkDeadline()
+            raise
+
+    return middleware
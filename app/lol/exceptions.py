@@ -16,3 +16,50 @@ class SummonerNotInGame(BaseException):
 
 class RetryMaximumAttempts(BaseException):
     pass
+
+
+class RateLimited(BaseException):
+    """
+    请求被限流 (HTTP 429)
+
+    @param retryAfter: 服务端通过 Retry-After 要求等待的秒数, 没有给出时为 None
+    """
+
+    def __init__(self, retryAfter=None):
+        super().__init__(retryAfter)
+        self.retryAfter = retryAfter
+
+
+class CircuitOpen(BaseException):
+    """
+    上游服务已被熔断, 请求没有发出
+
+    @param upstream: 上游服务名
+    @param retryAfter: 距离熔断器允许探测还有多少秒
+    """
+
+    def __init__(self, upstream, retryAfter=None):
+        super().__init__(upstream, retryAfter)
+        self.upstream = upstream
+        self.retryAfter = retryAfter
+
+
+class ClientNotConnected(BaseException):
+    """
+    没有连接客户端 (connector 还没有启动或已经关闭), 请求没有发出
+    """
+    pass
+
+
+class DeadlineExceeded(BaseException):
+    """
+    已经过了所在流水线的截止时间, 结果没人要了
+    """
+    pass
+
+
+class SnapshotError(BaseException):
+    """
+    游戏数据快照不存在、不完整或已损坏
+    """
+    pass
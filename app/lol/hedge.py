@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import deque
+
+
+class Hedger:
+    """
+    对冲请求
+
+    先向首选数据源发起请求, 若超过 `delay()` 秒还没有返回, 再向备用数据源发起等价的请求,
+    取先返回的那个; `delay()` 取首选数据源最近耗时的 `quantile` 分位数,
+    所以正常情况下只有大约 `1 - quantile` 的请求会被对冲
+
+    对冲只解决慢的问题: 首选数据源在对冲之前就出错的话直接抛出, 由调用者决定如何降级
+    """
+
+    def __init__(self, quantile=.9, window=100, minSamples=10,
+                 initialDelay=2., minDelay=.5, maxDelay=5.):
+        self.quantile = quantile
+        self.samples = deque(maxlen=window)
+        self.minSamples = minSamples
+        self.initialDelay = initialDelay
+        self.minDelay = minDelay
+        self.maxDelay = maxDelay
+
+        self.calls = 0
+        self.hedged = 0
+        self.backupWins = 0
+
+        # 备用数据源先返回时, 首选数据源还要多久才返回 (秒)
+        # 首选数据源在宽限期内没返回时按宽限期计, 所以是个下限
+        self.saved = 0.
+
+    def delay(self):
+        if len(self.samples) < self.minSamples:
+            return self.initialDelay
+
+        ordered = sorted(self.samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+
+        return min(self.maxDelay, max(self.minDelay, value))
+
+    async def run(self, primary, backup):
+        """
+        @param primary: () -> coroutine, 首选数据源
+        @param backup: () -> coroutine, 备用数据源, 返回值需与 `primary` 一致
+        @return: (结果, 是否由备用数据源返回)
+        """
+        self.calls += 1
+
+        start = time.monotonic()
+        first = asyncio.ensure_future(primary())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(first), self.delay()), False
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        finally:
+            if first.done() and not first.cancelled() and first.exception() is None:
+                self.samples.append(time.monotonic() - start)
+
+        self.hedged += 1
+        second = asyncio.ensure_future(backup())
+
+        try:
+            return await self.__race(first, second, start)
+        except BaseException:
+            first.cancel()
+            second.cancel()
+            raise
+
+    async def __race(self, first, second, start):
+        pending = {first, second}
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in (first, second):
+                if task not in done or task.exception() is not None:
+                    continue
+
+                if task is first:
+                    self.samples.append(time.monotonic() - start)
+                    second.cancel()
+
+                    return task.result(), False
+
+                self.backupWins += 1
+                asyncio.ensure_future(self.__measure(first, start))
+
+                return task.result(), True
+
+        # 两边都失败了, 抛首选数据源的异常
+        return first.result(), False
+
+    async def __measure(self, first, start):
+        """
+        备用数据源赢了之后, 再给首选数据源一段宽限期, 用来估计省下了多少时间
+        """
+        won = time.monotonic()
+        grace = self.delay()
+
+        try:
+            await asyncio.wait_for(first, grace)
+        except asyncio.TimeoutError:
+            # 首选数据源太慢了, 按宽限期记, 同时作为样本让分位数跟上
+            self.saved += grace
+            self.samples.append(won + grace - start)
+        except BaseException:
+            pass
+        else:
+            self.saved += time.monotonic() - won
+            self.samples.append(time.monotonic() - start)
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'hedged': self.hedged,
+            'hedgeRate': round(self.hedged / self.calls, 3) if self.calls else 0,
+            'backupWins': self.backupWins,
+            'savedSecs': round(self.saved, 3),
+            'delay': round(self.delay(), 3),
+        }
@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+from app.lol.scheduler import Priority, PriorityWaitQueue, currentPriority
+
+
+class AdaptiveLimiter:
+    """
+    AIMD (加性增, 乘性减) 自适应并发限制
+
+    - 请求成功且延迟正常时, 每跑满一个窗口的请求, 并发窗口 +1
+    - 请求出错、被限流 (429) 或延迟突增时, 并发窗口减半
+
+    延迟突增通过短期与长期两个延迟滑动平均的比值判断,
+    这样不同接口之间本身的延迟差异不会被误判为拥塞
+
+    排队的请求按 `Priority` 出队; 窗口大于 1 时, 后台请求最多只能占用 `窗口 - 1` 个名额,
+    留出来的名额保证用户操作触发的请求不用排在后台爬取的后面
+    """
+
+    def __init__(self, initial=1, minLimit=1, maxLimit=20,
+                 backoff=0.5, tolerance=2.0):
+        self.minLimit = minLimit
+        self.maxLimit = maxLimit
+        self.backoff = backoff
+        self.tolerance = tolerance
+
+        self.limit = float(min(max(initial, minLimit), maxLimit))
+        self.inflight = 0
+        self.waiters = PriorityWaitQueue()
+
+        self.shortRtt = None
+        self.longRtt = None
+        self.lastDecrease = 0
+
+        self.successes = 0
+        self.errors = 0
+        self.throttled = 0
+        self.decreases = 0
+
+    @property
+    def window(self):
+        return int(self.limit)
+
+    def queued(self):
+        return len(self.waiters)
+
+    def slot(self):
+        return LimiterSlot(self)
+
+    async def acquire(self, level=None):
+        if level is None:
+            level = currentPriority.get()
+
+        if not self.waiters and self.__canRun(level):
+            self.inflight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.push(level, future)
+
+        # 排队的可能都是被限制住的后台请求, 当前请求未必需要等
+        self.__wakeup()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已经分到了名额但调用者被取消了, 把名额还回去
+                self.inflight -= 1
+                self.__wakeup()
+            else:
+                self.waiters.remove(future)
+
+            raise
+
+    def release(self, latency=None, ok=True, throttled=False):
+        self.inflight -= 1
+
+        # latency 为 None 表示请求被取消, 不参与窗口调整
+        if latency is not None:
+            self.__feedback(latency, ok, throttled)
+
+        self.__wakeup()
+
+    def stats(self):
+        return {
+            'window': self.window,
+            'inflight': self.inflight,
+            'queued': self.queued(),
+            'queuedByPriority': self.waiters.depth(),
+            'promoted': self.waiters.promoted,
+            'successes': self.successes,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'decreases': self.decreases,
+        }
+
+    def __feedback(self, latency, ok, throttled):
+        if self.shortRtt is None:
+            self.shortRtt = self.longRtt = latency
+        else:
+            self.shortRtt += (latency - self.shortRtt) * .3
+            self.longRtt += (latency - self.longRtt) * .02
+
+        if throttled:
+            self.throttled += 1
+            self.__decrease()
+        elif not ok:
+            self.errors += 1
+            self.__decrease()
+        elif self.shortRtt > self.longRtt * self.tolerance:
+            self.successes += 1
+            self.__decrease()
+        else:
+            self.successes += 1
+
+            # 窗口没有被用满时不需要再增加
+            if self.waiters or self.inflight + 1 >= self.window:
+                self.limit = min(self.maxLimit, self.limit + 1 / self.limit)
+
+    def __decrease(self):
+        now = time.monotonic()
+
+        # 同一批次 (约一个 RTT 内) 的失败只减一次, 避免窗口被瞬间打到底
+        if now - self.lastDecrease < (self.shortRtt or 0):
+            return
+
+        self.lastDecrease = now
+        self.limit = max(self.minLimit, self.limit * self.backoff)
+        self.decreases += 1
+
+    def __canRun(self, level):
+        if level < Priority.BACKGROUND:
+            return self.inflight < self.window
+
+        return self.inflight < max(1, self.window - 1)
+
+    def __wakeup(self):
+        while self.waiters:
+            future = self.waiters.pop(self.__canRun)
+
+            if future is None:
+                break
+
+            self.inflight += 1
+            future.set_result(None)
+
+
+class LimiterSlot:
+    """
+    用法:
+
+        async with limiter.slot() as slot:
+            res = await session.get(...)
+            slot.status = res.status
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.status = None
+        self.start = None
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        self.start = time.monotonic()
+
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        if excType is asyncio.CancelledError:
+            self.limiter.release()
+            return
+
+        latency = time.monotonic() - self.start
+        throttled = self.status == 429
+        ok = excType is None and (self.status is None or self.status < 500)
+
+        self.limiter.release(latency, ok, throttled)
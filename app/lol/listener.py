@@ -18,6 +18,9 @@ class LolProcessExistenceListener(QThread):
         # 当前 Seraphine 连接的客户端 pid
         self.runningPid = 0
 
+        # 上一次检查时正在运行的所有客户端 pid
+        self.pids = []
+
         super().__init__(parent)
 
     def run(self):
@@ -31,6 +34,11 @@ class LolProcessExistenceListener(QThread):
             # 取一下当前运行中的所有客户端 pid
             pids = getLolClientPids(path)
 
+            # 多开的客户端有变化, 让连接池在后台连接新打开的、释放关掉的
+            if sorted(pids) != self.pids:
+                self.pids = sorted(pids)
+                signalBus.lolClientPidsChanged.emit(self.pids)
+
             # 如果有客户端正在运行
             if len(pids) != 0:
 
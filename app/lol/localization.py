@@ -0,0 +1,131 @@
+"""
+数据层用到的界面文字 (位置、段位、地图与模式名等)
+
+所有文字在第一次用到时一次性解析成只读的表, 之后解析战绩不再创建 QObject、调用 tr() 或读文件;
+`cfg.language` 改变后自动重建
+"""
+import json
+from types import MappingProxyType
+
+from PyQt5.QtCore import QObject
+
+from app.common.config import cfg, Language
+
+
+class ToolsTranslator(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+
+        self.top = self.tr("TOP")
+        self.jungle = self.tr("JUG")
+        self.middle = self.tr("MID")
+        self.bottom = self.tr("BOT")
+        self.support = self.tr("SUP")
+
+        self.positionMap = {
+            "TOP": self.top,
+            "JUNGLE": self.jungle,
+            "MID": self.middle,
+            "ADC": self.bottom,
+            "SUPPORT": self.support
+        }
+
+        self.rankedSolo = self.tr('Ranked Solo')
+        self.rankedFlex = self.tr("Ranked Flex")
+
+        self.unranked = self.tr("Unranked")
+        self.unknown = self.tr("Unknown")
+
+
+# 段位: (全称, 简称)
+TIERS = {
+    'Iron': ('坚韧黑铁', '黑铁'),
+    'Bronze': ('英勇黄铜', '黄铜'),
+    'Silver': ('不屈白银', '白银'),
+    'Gold': ('荣耀黄金', '黄金'),
+    'Platinum': ('华贵铂金', '铂金'),
+    'Emerald': ('流光翡翠', '翡翠'),
+    'Diamond': ('璀璨钻石', '钻石'),
+    'Master': ('超凡大师', '大师'),
+    'Grandmaster': ('傲世宗师', '宗师'),
+    'Challenger': ('最强王者', '王者'),
+}
+
+# 地图 id: (中文, 英文)
+MAPS = {
+    -1: ("特殊地图", "Special map"),
+    11: ("召唤师峡谷", "Summoner's Rift"),
+    12: ("嚎哭深渊", "Howling Abyss"),
+    21: ("极限闪击", "Nexus Blitz"),
+    30: ("斗魂竞技场", "Arena"),
+}
+
+# 客户端返回的模式名是中文, 英文界面下按这张表翻译
+GAME_MODES_PATH = "app/resource/i18n/gamemodes.json"
+
+
+class Localization:
+    __slots__ = ('language', 'positions', 'rankedSolo', 'rankedFlex',
+                 'unranked', 'unknown', 'tiers', 'maps', 'custom', 'gameModes')
+
+    def __init__(self, language):
+        tt = ToolsTranslator()
+        english = language == Language.ENGLISH
+
+        self.language = language
+
+        # 与 `ToolsTranslator` 的同名属性相同, 原来用 ToolsTranslator 的地方可以直接替换
+        self.positions = MappingProxyType(dict(tt.positionMap))
+        self.rankedSolo = tt.rankedSolo
+        self.rankedFlex = tt.rankedFlex
+        self.unranked = tt.unranked
+        self.unknown = tt.unknown
+
+        self.tiers = MappingProxyType(
+            {tier: (tier, tier) if english else names for tier, names in TIERS.items()})
+        self.maps = MappingProxyType(
+            {mapId: names[1 if english else 0] for mapId, names in MAPS.items()})
+        self.custom = "Custom" if english else "自定义"
+
+        gameModes = {}
+        if english:
+            with open(GAME_MODES_PATH, encoding="utf-8") as f:
+                gameModes = json.load(f)
+
+        self.gameModes = MappingProxyType(gameModes)
+
+    def tier(self, orig: str, short=False) -> str:
+        if orig == '':
+            return "--"
+
+        tier = orig.capitalize()
+        names = self.tiers.get(tier)
+
+        # 不认识的段位 (如新加的) 原样显示
+        if names is None:
+            return tier
+
+        return names[1 if short else 0]
+
+    def mapName(self, mapId) -> str:
+        return self.maps.get(mapId, self.maps[-1])
+
+    def modeName(self, name) -> str:
+        return self.gameModes.get(name, name)
+
+
+_current: Localization = None
+
+
+def localization() -> Localization:
+    """
+    @return: 当前语言的文字表
+    """
+    global _current
+
+    language = cfg.language.value
+
+    if _current is None or _current.language != language:
+        _current = Localization(language)
+
+    return _current
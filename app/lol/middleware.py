@@ -0,0 +1,167 @@
+import inspect
+import time
+
+from app.lol.retry import RetryPolicy, RetryStats, callWithRetry
+
+
+def compose(middlewares, handler):
+    """
+    把一串 middleware 组合成一个调用链, 在装饰 / 初始化时组合一次, 之后每次调用直接走链
+
+    middleware 的签名为 `async def middleware(ctx, next)`, 调用 `await next(ctx)` 交给下一环,
+    也可以不调用 (如命中缓存) 直接返回; `handler` 为最后一环, 签名为 `async def handler(ctx)`
+    """
+    chain = handler
+
+    for middleware in reversed(middlewares):
+        chain = _bind(middleware, chain)
+
+    return chain
+
+
+def _bind(middleware, next):
+    async def step(ctx):
+        return await middleware(ctx, next)
+
+    return step
+
+
+class CallMeta:
+    """
+    被装饰函数的元信息, 在 import 时计算一次, 不用每次调用都去 `inspect.signature`
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+
+        names = list(inspect.signature(func).parameters.keys())
+
+        # 第一个参数是 self(connector) 的实例, 兼容静态方法
+        self.skipSelf = bool(names) and names[0] == "self"
+        self.paramNames = names[1:] if self.skipSelf else names
+
+
+class Call:
+    """
+    一次函数调用
+    """
+    __slots__ = ('meta', 'args', 'kwargs')
+
+    def __init__(self, meta: CallMeta, args, kwargs):
+        self.meta = meta
+        self.args = args
+        self.kwargs = kwargs
+
+    def params(self):
+        """
+        将参数名与对应的实参值一一对应, 只在真的需要 (打日志、崩溃报告) 时才构建
+        """
+        args = self.args[1:] if self.meta.skipSelf else self.args
+        return dict(zip(self.meta.paramNames, args))
+
+
+async def invoke(call: Call):
+    return await call.meta.func(*call.args, **call.kwargs)
+
+
+class Request:
+    """
+    一次 HTTP 请求
+
+    @param upstream: 'lcu' 或 'sgp'
+    """
+    __slots__ = ('upstream', 'method', 'path', 'params',
+                 'data', 'headers', 'key', 'policy')
+
+    def __init__(self, upstream, method, path, params=None, data=None, headers=None):
+        self.upstream = upstream
+        self.method = method
+        self.path = path
+        self.params = params
+        self.data = data
+        self.headers = headers
+
+        # path 与 params 都相同的请求视为同一个请求, 用于缓存与合并
+        if params:
+            self.key = (path, tuple(sorted((k, str(v))
+                        for k, v in params.items())))
+        else:
+            self.key = (path, None)
+
+        # 命中的缓存策略, 由 cache 中间件填写
+        self.policy = None
+
+
+class Metrics:
+    """
+    按名字统计调用次数、失败次数与耗时
+    """
+
+    def __init__(self):
+        # name -> [calls, errors, 总耗时]
+        self.entries = {}
+
+    def record(self, name, elapsed, ok):
+        entry = self.entries.get(name)
+
+        if entry is None:
+            entry = self.entries[name] = [0, 0, 0.]
+
+        entry[0] += 1
+        entry[2] += elapsed
+
+        if not ok:
+            entry[1] += 1
+
+    def summary(self):
+        return {name: {
+            'calls': calls,
+            'errors': errors,
+            'avgMs': round(total / calls * 1000, 2),
+        } for name, (calls, errors, total) in self.entries.items()}
+
+
+def metricsMiddleware(getMetrics, nameOf):
+    """
+    @param getMetrics: (ctx) -> Metrics, 统计记在哪个实例上由调用决定, 所以每次调用时再取
+    @param nameOf: (ctx) -> str, 统计项的名字
+    """
+    async def middleware(ctx, next):
+        start = time.perf_counter()
+        ok = False
+
+        try:
+            res = await next(ctx)
+            ok = True
+
+            return res
+        finally:
+            getMetrics(ctx).record(nameOf(ctx), time.perf_counter() - start, ok)
+
+    return middleware
+
+
+def retryMiddleware(policy: RetryPolicy, getStats):
+    """
+    @param getStats: (call) -> RetryStats, 同 `metricsMiddleware` 的 `getMetrics`
+    """
+    async def middleware(call: Call, next):
+        return await callWithRetry(policy, getStats(call), call.meta.name, next, call)
+
+    return middleware
+
+
+def singleFlightMiddleware(flight, keyOf):
+    """
+    @param keyOf: (ctx) -> key, 返回 None 表示该请求不参与合并
+    """
+    async def middleware(ctx, next):
+        key = keyOf(ctx)
+
+        if key is None:
+            return await next(ctx)
+
+        return await flight.do(key, next, ctx)
+
+    return middleware
@@ -0,0 +1,146 @@
+import time
+
+
+class MirroredResource:
+    __slots__ = ('uri', 'event', 'value', 'known', 'version', 'updatedAt')
+
+    def __init__(self, uri, event):
+        self.uri = uri
+        self.event = event
+
+        self.value = None
+        self.known = False
+        self.version = 0
+        self.updatedAt = 0
+
+
+class StateMirror:
+    """
+    LCU 状态的本地镜像
+
+    订阅若干资源的 websocket 事件, 保存每个资源最新的值, 读取时直接返回, 不再请求 LCU;
+    镜像里还没有的资源 (刚启动 / 被 Delete 了) 由调用者请求一次 LCU 后通过 `seed()` 填进来
+
+    只有 websocket 订阅成功之后 (`live`) 镜像才是可信的, 在那之前的值可能已经错过了事件,
+    所以 `get()` 一律视为未命中; 返回的对象与其他读者共享, 不要修改
+    """
+
+    def __init__(self, resources):
+        """
+        @param resources: [(uri, websocket 事件名)]
+        """
+        self.resources = {uri: MirroredResource(uri, event)
+                          for uri, event in resources}
+
+        self.live = False
+
+        # 任意资源发生变化时 +1
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.events = 0
+
+    def attach(self, listener):
+        """
+        在 `listener` 上订阅所有资源, 需要在其他订阅之前调用,
+        保证同一个事件先更新镜像, 再交给其他回调处理
+        """
+        for resource in self.resources.values():
+            listener.subscribe(event=resource.event, uri=resource.uri,
+                               type=('Create', 'Update', 'Delete'))(self.onEvent)
+
+    async def onEvent(self, event):
+        self.apply(event['uri'], event['eventType'], event['data'])
+
+    def apply(self, uri, eventType, data):
+        resource = self.resources.get(uri)
+
+        if resource is None:
+            return
+
+        self.events += 1
+
+        if eventType == 'Delete':
+            # 资源不存在时 LCU 返回的是错误信息, 交给调用者自己去请求
+            self.__set(resource, None, False)
+        else:
+            self.__set(resource, data, True)
+
+    def seed(self, uri, value, since):
+        """
+        用请求 LCU 得到的值填充镜像
+
+        @param since: 发请求之前 `versionOf(uri)` 的值, 期间有新事件的话以事件为准
+        """
+        resource = self.resources.get(uri)
+
+        if resource is None or not self.live or resource.version != since:
+            return
+
+        self.__set(resource, value, True)
+
+    def get(self, uri):
+        """
+        @return: 镜像中的值, 未命中时返回 None
+        """
+        resource = self.resources.get(uri)
+
+        if resource is None or not self.live or not resource.known:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return resource.value
+
+    def versionOf(self, uri):
+        return self.resources[uri].version
+
+    def setLive(self, live):
+        """
+        websocket 断开时所有值都不再可信, 全部丢弃
+        """
+        self.live = live
+
+        if not live:
+            for resource in self.resources.values():
+                self.__set(resource, None, False)
+
+    def __set(self, resource: MirroredResource, value, known):
+        resource.value = value
+        resource.known = known
+        resource.version += 1
+        resource.updatedAt = time.monotonic()
+
+        self.version += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+
+        return {
+            'live': self.live,
+            'version': self.version,
+            'events': self.events,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / total, 3) if total else 0,
+        }
+
+
+# 这些资源在对局流程的各个阶段被反复读取, 由 websocket 推送保持最新
+LCU_MIRRORED_RESOURCES = [
+    ('/lol-gameflow/v1/gameflow-phase',
+     'OnJsonApiEvent_lol-gameflow_v1_gameflow-phase'),
+    ('/lol-gameflow/v1/session',
+     'OnJsonApiEvent_lol-gameflow_v1_session'),
+    ('/lol-champ-select/v1/session',
+     'OnJsonApiEvent_lol-champ-select_v1_session'),
+    ('/lol-champ-select/v1/pin-drop-notification',
+     'OnJsonApiEvent_lol-champ-select_v1_pin-drop-notification'),
+    ('/lol-matchmaking/v1/ready-check',
+     'OnJsonApiEvent_lol-matchmaking_v1_ready-check'),
+    ('/lol-lobby/v2/lobby',
+     'OnJsonApiEvent_lol-lobby_v2_lobby'),
+    ('/lol-summoner/v1/current-summoner',
+     'OnJsonApiEvent_lol-summoner_v1_current-summoner'),
+]
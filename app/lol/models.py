@@ -0,0 +1,284 @@
+"""
+战绩列表中每一局的精简记录
+
+LCU 与 SGP 返回的对局结构不同, 这里统一解析成同一种记录, 只保存 id 与数值,
+时间、图标路径等字符串在界面读取时才生成; 原始的对局数据解析完就可以释放
+
+记录同时支持 `game.kills` 与 `game['kills']` 两种读法, 界面代码沿用 dict 的写法
+"""
+import time
+
+
+def timeStampToStr(stamp):
+    """
+    @param stamp: Millisecond timestamp
+    """
+    timeArray = time.localtime(stamp / 1000)
+    return time.strftime("%Y/%m/%d %H:%M", timeArray)
+
+
+def timeStampToShortStr(stamp):
+    timeArray = time.localtime(stamp / 1000)
+    return time.strftime("%m/%d", timeArray)
+
+
+def secsToStr(secs):
+    return time.strftime("%M:%S", time.gmtime(secs))
+
+
+def championIconPath(championId):
+    if championId in [-1, 0]:
+        return "app/resource/images/champion-0.png"
+
+    return f"app/resource/game/champion icons/{championId}.png"
+
+
+def itemIconPath(itemId):
+    if itemId == 0:
+        return "app/resource/images/item-0.png"
+
+    return f"app/resource/game/item icons/{itemId}.png"
+
+
+def runeIconPath(runeId):
+    if runeId == 0:
+        return "app/resource/images/rune-0.png"
+
+    return f"app/resource/game/rune icons/{runeId}.png"
+
+
+def summonerSpellIconPath(spellId):
+    return f"app/resource/game/summoner spell icons/{spellId}.png"
+
+
+def parsePosition(queueId, lane, role):
+    """
+    @return: `Localization.positions` 的 key, 只有排位才有, 否则为 None
+    """
+    if queueId not in (420, 440):
+        return None
+
+    if lane == 'TOP':
+        return 'TOP'
+    elif lane == 'JUNGLE':
+        return 'JUNGLE'
+    elif lane == 'MIDDLE':
+        return 'MID'
+    elif role == 'SUPPORT':
+        return 'SUPPORT'
+    elif lane == 'BOTTOM' and role == 'CARRY':
+        return 'ADC'
+
+    return None
+
+
+class Record:
+    """
+    支持 `record['field']` 读取, 找不到时抛 KeyError, 与 dict 保持一致
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+class Participant(Record):
+    """
+    某个召唤师在一局中的表现
+    """
+    __slots__ = ('championId', 'spell1Id', 'spell2Id', 'champLevel',
+                 'kills', 'deaths', 'assists', 'itemIds', 'runeId',
+                 'cs', 'gold', 'win', 'remake', 'positionKey')
+
+    def __init__(self, championId, spell1Id, spell2Id, champLevel,
+                 kills, deaths, assists, itemIds, runeId,
+                 cs, gold, win, remake, positionKey):
+        self.championId = championId
+        self.spell1Id = spell1Id
+        self.spell2Id = spell2Id
+        self.champLevel = champLevel
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.itemIds = itemIds
+        self.runeId = runeId
+        self.cs = cs
+        self.gold = gold
+        self.win = win
+        self.remake = remake
+        self.positionKey = positionKey
+
+    @classmethod
+    def fromLcu(cls, participant, queueId):
+        """
+        @param participant: LCU 战绩列表中 `game['participants']` 的元素
+        """
+        stats = participant['stats']
+        timeline = participant['timeline']
+
+        return cls(
+            participant['championId'],
+            participant['spell1Id'],
+            participant['spell2Id'],
+            stats['champLevel'],
+            stats['kills'],
+            stats['deaths'],
+            stats['assists'],
+            (stats['item0'], stats['item1'], stats['item2'], stats['item3'],
+             stats['item4'], stats['item5'], stats['item6']),
+            stats['perk0'],
+            stats['totalMinionsKilled'] + stats['neutralMinionsKilled'],
+            stats['goldEarned'],
+            stats['win'],
+            stats['gameEndedInEarlySurrender'],
+            parsePosition(queueId, timeline['lane'], timeline['role']),
+        )
+
+    @classmethod
+    def fromSgp(cls, participant, queueId):
+        """
+        @param participant: SGP 对局中 `game['json']['participants']` 的元素
+        """
+        p = participant
+
+        return cls(
+            p['championId'],
+            p['spell1Id'],
+            p['spell2Id'],
+            p['champLevel'],
+            p['kills'],
+            p['deaths'],
+            p['assists'],
+            (p['item0'], p['item1'], p['item2'], p['item3'],
+             p['item4'], p['item5'], p['item6']),
+            p['perks']['styles'][0]['selections'][0]['perk'],
+            p['totalMinionsKilled'] + p['neutralMinionsKilled'],
+            p['goldEarned'],
+            p['win'],
+            p['gameEndedInEarlySurrender'],
+            parsePosition(queueId, p['lane'], p['role']),
+        )
+
+    @property
+    def championIcon(self):
+        return championIconPath(self.championId)
+
+    @property
+    def spell1Icon(self):
+        return summonerSpellIconPath(self.spell1Id)
+
+    @property
+    def spell2Icon(self):
+        return summonerSpellIconPath(self.spell2Id)
+
+    @property
+    def itemIcons(self):
+        return [itemIconPath(itemId) for itemId in self.itemIds]
+
+    @property
+    def runeIcon(self):
+        return runeIconPath(self.runeId)
+
+    @property
+    def position(self):
+        if self.positionKey is None:
+            return None
+
+        from app.lol.localization import localization
+        return localization().positions[self.positionKey]
+
+
+def queueAndMapNames(manager, queueId, mapId):
+    """
+    @return: (模式名, 地图名); 自定义对局 (queueId 为 0) 的地图名按 mapId 取
+    """
+    names = manager.getNameMapByQueueId(queueId)
+
+    if queueId != 0:
+        return names['name'], names['map']
+
+    return names['name'], manager.getMapNameById(mapId)
+
+
+class GameSummary(Record):
+    """
+    战绩列表中的一局, 以及查询的召唤师在这局中的表现 (`player`)
+
+    `player` 的字段可以直接在 GameSummary 上读取, 如 `game.kills`
+
+    模式名 (`name`) 与地图名 (`map`) 在解析时用当时的 `JsonManager` 取好, 之后界面渲染时
+    (如翻页时才创建的战绩卡片) 不再依赖 connector 的状态
+    """
+    __slots__ = ('gameId', 'queueId', 'mapId', 'name', 'map', 'timeStamp', 'gameDuration',
+                 'player')
+
+    def __init__(self, gameId, queueId, mapId, name, map, timeStamp, gameDuration,
+                 player: Participant):
+        self.gameId = gameId
+        self.queueId = queueId
+        self.mapId = mapId
+        # 模式名与地图名, 都是 JsonManager 中共用的字符串
+        self.name = name
+        self.map = map
+        # 毫秒级时间戳
+        self.timeStamp = timeStamp
+        # 秒
+        self.gameDuration = gameDuration
+        self.player = player
+
+    @classmethod
+    def fromLcu(cls, game, manager):
+        """
+        @param game: LCU 战绩列表 (`getSummonerGamesByPuuid`) 中的一局, 只包含查询的召唤师
+        @param manager: 用于取模式名与地图名的 `JsonManager`
+        """
+        queueId = game['queueId']
+        mapId = game['mapId']
+
+        return cls(game['gameId'], queueId, mapId, *queueAndMapNames(manager, queueId, mapId),
+                   game['gameCreation'], game['gameDuration'],
+                   Participant.fromLcu(game['participants'][0], queueId))
+
+    @classmethod
+    def fromSgp(cls, game, puuid, manager):
+        """
+        @param game: SGP 战绩列表 (`getSummonerGamesByPuuidViaSGP`) 中的一局, 包含所有召唤师
+        @param manager: 用于取模式名与地图名的 `JsonManager`
+        """
+        game = game['json']
+        queueId = game['queueId']
+        mapId = game['mapId']
+
+        participant = None
+        for p in game['participants']:
+            if p['puuid'] == puuid:
+                participant = p
+
+        return cls(game['gameId'], queueId, mapId, *queueAndMapNames(manager, queueId, mapId),
+                   game['gameCreation'], game['gameDuration'],
+                   Participant.fromSgp(participant, queueId))
+
+    def __getattr__(self, name):
+        # 只有在 GameSummary 自己找不到该属性时才会走到这里
+        if name == 'player':
+            raise AttributeError(name)
+
+        return getattr(self.player, name)
+
+    @property
+    def time(self):
+        return timeStampToStr(self.timeStamp)
+
+    @property
+    def shortTime(self):
+        return timeStampToShortStr(self.timeStamp)
+
+    @property
+    def duration(self):
+        return secsToStr(self.gameDuration)
@@ -1,7 +1,9 @@
 import aiohttp
 from async_lru import alru_cache
 
+from app.common.http import hub
 from app.lol.connector import connector
+from app.lol.upstream import upstreams
 
 TAG = "opgg"
 
@@ -11,7 +13,9 @@ class Opgg:
         self.session = None
 
     async def start(self):
-        self.session = aiohttp.ClientSession("https://lol-api-champion.op.gg")
+        self.session = hub.session(
+            "https://lol-api-champion.op.gg",
+            timeout=aiohttp.ClientTimeout(total=10, sock_connect=5))
 
     async def close(self):
         if self.session:
@@ -82,7 +86,10 @@ class Opgg:
         return []
 
     async def __get(self, url, params=None):
-        res = await self.session.get(url, params=params, ssl=False, proxy=None)
+        async with upstreams['opgg'].guard() as guard:
+            res = await self.session.get(url, params=params, ssl=False, proxy=None)
+            guard.status = res.status
+
         return await res.json()
 
 
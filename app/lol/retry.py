@@ -0,0 +1,166 @@
+import asyncio
+import random
+
+from app.lol.deadline import remaining
+from app.lol.exceptions import (CircuitOpen, ClientNotConnected, DeadlineExceeded,
+                                RateLimited, RetryMaximumAttempts, SummonerNotFound)
+
+
+# 这些异常表示调用者自己不想继续了, 永远不重试
+NEVER_RETRY = (asyncio.CancelledError, DeadlineExceeded, KeyboardInterrupt,
+               SystemExit, GeneratorExit)
+
+# 默认不重试的异常:
+# - SummonerNotFound 再重试会报 429 (限流)
+# - ClientNotConnected 为没有连接客户端, 重试也不会变好, 应该立即失败
+#   (ReferenceError 是客户端已连接但还没准备好, 仍然重试)
+DEFAULT_GIVE_UP = (SummonerNotFound, ClientNotConnected)
+
+
+class RetryBudget:
+    """
+    重试预算, 防止 LCU 不可用时大量请求同时重试, 把客户端打得更慢
+
+    每次调用存入 `ratio` 个令牌, 每次重试取出 1 个, 令牌不足时直接放弃重试;
+    `reserve` 为初始 (也是最多) 持有的令牌数, 保证调用量很少时也能正常重试
+    """
+
+    def __init__(self, ratio=.2, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = float(reserve)
+
+    def deposit(self):
+        self.balance = min(self.reserve, self.balance + self.ratio)
+
+    def withdraw(self):
+        if self.balance < 1:
+            return False
+
+        self.balance -= 1
+        return True
+
+
+class RetryPolicy:
+    def __init__(self, count=5, base=.2, cap=4.0, retryOn=(BaseException,),
+                 giveUpOn=DEFAULT_GIVE_UP, budget: RetryBudget = None):
+        """
+        @param count: 最多尝试的次数 (包括第一次)
+        @param base: 第一次重试前等待的时间 (秒), 之后每次翻倍
+        @param cap: 单次等待的上限 (秒)
+        @param retryOn: 遇到这些异常时重试
+        @param giveUpOn: 遇到这些异常时直接抛出, 优先级高于 `retryOn`
+        @param budget: 重试预算, 为 None 时不限制
+        """
+        self.count = count
+        self.base = base
+        self.cap = cap
+        self.retryOn = retryOn
+        self.giveUpOn = giveUpOn
+        self.budget = budget
+
+    def shouldRetry(self, e: BaseException):
+        if isinstance(e, NEVER_RETRY) or isinstance(e, self.giveUpOn):
+            return False
+
+        # 被限流时无论如何都值得再试一次
+        return isinstance(e, RateLimited) or isinstance(e, self.retryOn)
+
+    def delay(self, attempt, e: BaseException = None):
+        """
+        第 `attempt` 次 (从 0 开始) 重试前需要等待的时间
+
+        指数退避加一半的随机抖动, 避免一批同时失败的请求又同时重试;
+        服务端通过 Retry-After 指定了等待时间, 或是熔断器给出了剩余冷却时间的话以其为准
+        """
+        if isinstance(e, (RateLimited, CircuitOpen)) and e.retryAfter is not None:
+            return min(e.retryAfter, self.cap * 4)
+
+        delay = min(self.cap, self.base * 2 ** attempt)
+
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryStats:
+    """
+    按接口统计重试次数与等待时间
+    """
+
+    def __init__(self):
+        # name -> {'calls', 'retries', 'waited', 'failures', 'budgetExhausted'}
+        self.endpoints = {}
+
+    def get(self, name):
+        stat = self.endpoints.get(name)
+
+        if stat is None:
+            stat = self.endpoints[name] = {
+                'calls': 0,
+                'retries': 0,
+                'waited': 0.,
+                'failures': 0,
+                'budgetExhausted': 0,
+            }
+
+        return stat
+
+    def summary(self):
+        """
+        只返回发生过重试或失败的接口, 按等待时间从多到少排序
+        """
+        items = [(name, stat) for name, stat in self.endpoints.items()
+                 if stat['retries'] or stat['failures']]
+        items.sort(key=lambda x: -x[1]['waited'])
+
+        return {name: {**stat, 'waited': round(stat['waited'], 3)}
+                for name, stat in items}
+
+
+async def callWithRetry(policy: RetryPolicy, stats: RetryStats, name, func, *args, **kwargs):
+    """
+    按 `policy` 调用 `func`, 重试之间使用 `asyncio.sleep` 等待, 不会阻塞事件循环
+
+    用尽次数后, 有异常抛最后一次的异常, 否则抛 `RetryMaximumAttempts`
+    """
+    stat = stats.get(name)
+    stat['calls'] += 1
+
+    if policy.budget:
+        policy.budget.deposit()
+
+    exce = None
+
+    for attempt in range(policy.count):
+        try:
+            return await func(*args, **kwargs)
+        except BaseException as e:
+            exce = e
+
+            if not policy.shouldRetry(e):
+                raise
+
+            # 最后一次失败了就不用再等了
+            if attempt == policy.count - 1:
+                break
+
+            if policy.budget and not policy.budget.withdraw():
+                stat['budgetExhausted'] += 1
+                break
+
+            delay = policy.delay(attempt, e)
+
+            # 等完就过了截止时间的话, 不用再试了
+            left = remaining()
+            if left is not None and left <= delay:
+                stat['failures'] += 1
+                raise DeadlineExceeded() from e
+
+            stat['retries'] += 1
+            stat['waited'] += delay
+
+            await asyncio.sleep(delay)
+
+    stat['failures'] += 1
+
+    raise exce if exce else RetryMaximumAttempts(
+        "Exceeded maximum retry attempts.")
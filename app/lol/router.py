@@ -0,0 +1,195 @@
+import asyncio
+import logging
+
+from app.common.logger import logger
+
+
+TAG = "Router"
+
+
+class Coalescer:
+    """
+    最新值优先的串行处理器
+
+    同一时间只处理一个值; 处理期间提交的值只保留最新的那个, 处理完后接着处理它,
+    中间被覆盖掉的值直接丢弃. 适合选人阶段这种一次推送一整份快照、只关心最新状态的场景
+    """
+
+    def __init__(self, handler, name=""):
+        """
+        @param handler: async (item) -> None
+        """
+        self.handler = handler
+        self.name = name
+
+        self.task = None
+        self.latest = None
+        self.hasLatest = False
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def submit(self, item):
+        self.submitted += 1
+
+        if self.task is not None:
+            if self.hasLatest:
+                self.dropped += 1
+
+            self.latest, self.hasLatest = item, True
+            return
+
+        self.task = asyncio.ensure_future(self.__run(item))
+
+    async def __run(self, item):
+        try:
+            while True:
+                try:
+                    await self.handler(item)
+                except Exception as e:
+                    logger.exception(f"{self.name} handler failed", e, TAG)
+
+                self.processed += 1
+
+                if not self.hasLatest:
+                    break
+
+                item, self.latest, self.hasLatest = self.latest, None, False
+        finally:
+            self.task = None
+            self.latest, self.hasLatest = None, False
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'dropped': self.dropped,
+        }
+
+
+class Route:
+    __slots__ = ('uri', 'types', 'handler', 'coalescer', 'calls')
+
+    def __init__(self, uri, types, handler, coalescer):
+        self.uri = uri
+        self.types = types
+        self.handler = handler
+        self.coalescer = coalescer
+
+        self.calls = 0
+
+
+class EventRouter:
+    """
+    websocket 事件分发
+
+    按 (uri, eventType) 建立索引, 每条消息只查一次字典, 不用遍历所有订阅;
+    同时执行的回调不超过 `maxConcurrency` 个, 多出来的排队等待
+    """
+
+    def __init__(self, maxConcurrency=8):
+        # (uri, eventType) -> [Route], 按订阅顺序
+        self.index = {}
+
+        # uri 与 type 都为空的订阅, 匹配所有事件
+        self.wildcards = []
+        self.routes = []
+
+        self.semaphore = asyncio.Semaphore(maxConcurrency)
+        self.tasks = set()
+
+        self.received = 0
+        self.unmatched = 0
+
+        # 在排队等待执行的回调数
+        self.waiting = 0
+        self.maxWaiting = 0
+
+    def add(self, uri, types, handler, coalesce=False):
+        """
+        @param coalesce: 为 True 时, 回调来不及处理的事件只保留最新的一个
+        """
+        route = Route(uri, types, handler, None)
+        self.routes.append(route)
+
+        if coalesce:
+            route.coalescer = Coalescer(
+                lambda data: self.__call(route, data), uri)
+
+        if not (uri or types):
+            self.wildcards.append(route)
+            return route
+
+        for type in types:
+            self.index.setdefault((uri, type), []).append(route)
+
+        return route
+
+    def dispatch(self, data):
+        self.received += 1
+
+        routes = self.index.get((data.get('uri'), data.get('eventType')))
+
+        if not routes and not self.wildcards:
+            self.unmatched += 1
+            return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(data, TAG)
+
+        for route in routes or ():
+            self.__submit(route, data)
+
+        for route in self.wildcards:
+            self.__submit(route, data)
+
+    def __submit(self, route: Route, data):
+        if route.coalescer is not None:
+            route.coalescer.submit(data)
+            return
+
+        task = asyncio.create_task(self.__call(route, data))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def __call(self, route: Route, data):
+        self.waiting += 1
+        self.maxWaiting = max(self.maxWaiting, self.waiting)
+
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        try:
+            route.calls += 1
+            await route.handler(data)
+        except Exception as e:
+            logger.exception(f"{route.uri} handler failed", e, TAG)
+        finally:
+            self.semaphore.release()
+
+    def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+        for route in self.routes:
+            if route.coalescer is not None:
+                route.coalescer.cancel()
+
+    def stats(self):
+        coalesced = {route.uri: route.coalescer.stats()
+                     for route in self.routes if route.coalescer is not None}
+
+        return {
+            'received': self.received,
+            'unmatched': self.unmatched,
+            'waiting': self.waiting,
+            'maxWaiting': self.maxWaiting,
+            'coalesced': coalesced,
+        }
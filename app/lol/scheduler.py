@@ -0,0 +1,103 @@
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    # 用户正在等着看的请求, 如点开一局对局详情、打开生涯界面、对局信息界面
+    INTERACTIVE = 0
+
+    # 预加载, 如英雄列表的头像、OP.GG 界面
+    PREFETCH = 1
+
+    # 后台爬取, 如搜索界面持续加载的全部历史战绩
+    BACKGROUND = 2
+
+
+# 当前请求所属的优先级, 随 asyncio 的 context 传递,
+# 在某个优先级下 create_task 出来的任务也会继承这个优先级
+currentPriority = contextvars.ContextVar(
+    "requestPriority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority(level: Priority):
+    """
+    用法:
+
+        with priority(Priority.BACKGROUND):
+            await connector.getSummonerGamesByPuuidSlowly(...)
+    """
+    token = currentPriority.set(level)
+
+    try:
+        yield
+    finally:
+        currentPriority.reset(token)
+
+
+class PriorityWaitQueue:
+    """
+    按优先级排队的等待队列, 同一优先级内先进先出
+
+    为了防止低优先级的请求被一直饿着, 每排队 `aging` 秒, 其有效优先级提升一级
+    """
+
+    def __init__(self, aging=2.0):
+        self.aging = aging
+        self.queues = {level: deque() for level in Priority}
+
+        # 靠老化插队出去的次数
+        self.promoted = 0
+
+    def __len__(self):
+        return sum(len(q) for q in self.queues.values())
+
+    def __bool__(self):
+        return any(self.queues.values())
+
+    def push(self, level: Priority, future):
+        self.queues[level].append((time.monotonic(), future))
+
+    def remove(self, future):
+        for q in self.queues.values():
+            for item in q:
+                if item[1] is future:
+                    q.remove(item)
+                    return
+
+    def depth(self):
+        return {level.name: len(q) for level, q in self.queues.items()}
+
+    def pop(self, canRun):
+        """
+        取出下一个可以运行的等待者
+
+        @param canRun: (level) -> bool, 该优先级当前是否允许占用名额
+        @return: future, 没有可运行的等待者时返回 None
+        """
+        now = time.monotonic()
+        heads = []
+
+        for level, q in self.queues.items():
+            # 顺手清理掉已经被取消的等待者
+            while q and q[0][1].done():
+                q.popleft()
+
+            if q:
+                enqueued = q[0][0]
+                effective = level - int((now - enqueued) / self.aging)
+                heads.append((effective, level))
+
+        for effective, level in sorted(heads):
+            if not canRun(level):
+                continue
+
+            if effective < level and any(l < level for _, l in heads):
+                self.promoted += 1
+
+            return self.queues[level].popleft()[1]
+
+        return None
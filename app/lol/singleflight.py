@@ -0,0 +1,61 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    合并并发的相同调用
+
+    同一个 key 同一时刻只会有一个调用在途, 期间到达的其他调用者不再发起新的调用,
+    而是等待并共享在途调用的结果 (或异常)
+
+    所有调用者都放弃 (被取消、超时) 后, 在途的调用也会被取消, 不再白白占用资源
+    """
+
+    def __init__(self):
+        # key -> [future, 等待中的调用者数量]
+        self.calls = {}
+
+        # 被合并掉 (没有真正发起) 的调用次数
+        self.shared = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        entry = self.calls.get(key)
+
+        if entry is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            entry = [future, 0]
+            future.add_done_callback(lambda f: self.__onDone(key, f))
+            self.calls[key] = entry
+        else:
+            self.shared += 1
+
+        future = entry[0]
+        entry[1] += 1
+
+        try:
+            # 某个调用者被取消时, 不应该把其他调用者正在等待的调用一起取消掉
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            entry[1] -= 1
+
+            if entry[1] == 0 and not future.done():
+                future.cancel()
+
+                # 之后再来的调用者重新发起, 不要等到一个正在被取消的调用上
+                if self.calls.get(key) is entry:
+                    del self.calls[key]
+
+            raise
+
+    def inFlight(self):
+        return len(self.calls)
+
+    def __onDone(self, key, future):
+        entry = self.calls.get(key)
+
+        if entry is not None and entry[0] is future:
+            del self.calls[key]
+
+        # 所有调用者都被取消时, 取一下异常, 避免 "exception was never retrieved"
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,82 @@
+"""
+游戏数据快照
+
+文件格式: 第一行是 JSON 的文件头, 记录元信息与每一节 (section) 的偏移、长度与校验值,
+之后依次是各节 zlib 压缩过的 JSON; 打开时读入并校验整个文件, 各节在第一次用到时才解压、解析
+"""
+import os
+import zlib
+
+from app.common import fastjson
+from app.lol.exceptions import SnapshotError
+
+
+FORMAT = 1
+
+
+def writeSnapshot(path, meta, sections):
+    """
+    @param meta: 写入文件头的元信息, 如客户端版本
+    @param sections: 节名 -> 可以 JSON 序列化的对象
+    """
+    blobs = {name: zlib.compress(fastjson.dumps(value).encode('utf-8'))
+             for name, value in sections.items()}
+
+    index = {}
+    offset = 0
+    for name, blob in blobs.items():
+        index[name] = [offset, len(blob), zlib.crc32(blob)]
+        offset += len(blob)
+
+    header = fastjson.dumps({'format': FORMAT, 'meta': meta, 'sections': index})
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # 先写临时文件再替换, 写到一半退出也不会留下损坏的快照
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(header.encode('utf-8') + b'\n')
+
+        for blob in blobs.values():
+            f.write(blob)
+
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    def __init__(self, path):
+        """
+        读入整个文件 (压缩后的数据, 不大) 并校验每一节, 之后使用时不会再读文件或发现损坏;
+        文件不存在、格式不对、大小对不上或校验失败时抛 SnapshotError
+        """
+        self.path = path
+
+        try:
+            with open(path, 'rb') as f:
+                header = fastjson.loads(f.readline())
+                data = f.read()
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"{path}: {e!r}") from None
+
+        if not isinstance(header, dict) or header.get('format') != FORMAT:
+            raise SnapshotError(f"{path}: unknown format")
+
+        self.meta = header['meta']
+        self.sections = header['sections']
+
+        if sum(length for _, length, _ in self.sections.values()) != len(data):
+            raise SnapshotError(f"{path}: truncated")
+
+        # 节名 -> 压缩的数据, 解压与解析留到第一次用到时
+        self.blobs = {}
+
+        for name, (offset, length, crc) in self.sections.items():
+            blob = data[offset:offset + length]
+
+            if zlib.crc32(blob) != crc:
+                raise SnapshotError(f"{path}: section {name} corrupted")
+
+            self.blobs[name] = blob
+
+    def section(self, name):
+        return fastjson.loads(zlib.decompress(self.blobs[name]))
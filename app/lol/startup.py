@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+
+class Step:
+    __slots__ = ('name', 'func', 'deps', 'start', 'end')
+
+    def __init__(self, name, func, deps):
+        self.name = name
+        self.func = func
+        self.deps = deps
+
+        # 相对于整个流程开始的时间 (秒)
+        self.start = None
+        self.end = None
+
+
+class StartupGraph:
+    """
+    按依赖关系并发执行的启动流程
+
+    每个步骤在它依赖的步骤全部完成后立刻开始, 互不依赖的步骤同时进行;
+    任何一个步骤失败时取消其余步骤, 并抛出该异常
+
+    用法:
+
+        graph = StartupGraph("connector")
+        graph.add("sessions", initSessions)
+        graph.add("manager", initManager, deps=("sessions",))
+        await graph.run()
+        logger.info(graph.report(), TAG)
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+
+        # name -> Step, 按添加顺序; 依赖的步骤需要先添加
+        self.steps = {}
+
+        self.begin = None
+        self.elapsed = None
+
+    def add(self, name, func, deps=()):
+        """
+        @param func: 无参数的函数, 同步或异步均可
+        @param deps: 依赖的步骤名
+        """
+        for dep in deps:
+            if dep not in self.steps:
+                raise ValueError(f"unknown dependency {dep!r} of {name!r}")
+
+        self.steps[name] = Step(name, func, tuple(deps))
+
+    async def run(self):
+        self.begin = time.perf_counter()
+        tasks = {}
+
+        for step in self.steps.values():
+            tasks[step.name] = asyncio.ensure_future(
+                self.__run(step, [tasks[dep] for dep in step.deps]))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.elapsed = time.perf_counter() - self.begin
+
+    async def __run(self, step: Step, deps):
+        for dep in deps:
+            await dep
+
+        step.start = time.perf_counter() - self.begin
+
+        res = step.func()
+        if asyncio.iscoroutine(res):
+            await res
+
+        step.end = time.perf_counter() - self.begin
+
+    def report(self):
+        """
+        @return: 每个步骤的开始时间与耗时, 如
+
+            connector 1.234s: sessions +0.000s 0.001s | manager +0.001s 0.812s | ...
+        """
+        steps = sorted((s for s in self.steps.values() if s.start is not None),
+                       key=lambda s: s.start)
+
+        parts = [f"{s.name} +{s.start:.3f}s "
+                 + (f"{s.end - s.start:.3f}s" if s.end is not None else "unfinished")
+                 for s in steps]
+
+        total = f"{self.elapsed:.3f}s" if self.elapsed is not None else "running"
+
+        return f"{self.name} {total}: " + " | ".join(parts)
+
+
+class Stopwatch:
+    """
+    记录一个顺序流程中每一段的耗时
+
+        watch = Stopwatch("client started")
+        ...
+        watch.lap("connector")
+        ...
+        logger.info(watch.report(), TAG)
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self.begin = self.last = time.perf_counter()
+
+        # [(name, 耗时)]
+        self.laps = []
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.laps.append((name, now - self.last))
+        self.last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.begin
+
+    def report(self):
+        parts = [f"{name} {secs:.3f}s" for name, secs in self.laps]
+
+        return f"{self.name} {self.elapsed():.3f}s: " + " | ".join(parts)
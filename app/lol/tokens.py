@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import json
+import time
+
+
+def parseJwtExpiry(token):
+    """
+    @return: JWT 中的过期时间 (秒级时间戳), 不是 JWT 或没有 exp 时返回 None
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """
+    SGP token 的生命周期
+
+    - 快过期 (剩余不到 `refreshAhead` 秒) 时在后台提前刷新, 请求继续使用还没过期的旧 token
+    - 已经过期或还没有 token 时, 请求等待刷新完成
+    - 被服务端拒绝 (401) 时调用 `refresh(stale)`, 同时被拒绝的请求只会触发一次刷新, 都等待同一次的结果
+    """
+
+    def __init__(self, fetch, refreshAhead=120.):
+        """
+        @param fetch: async () -> str, 获取新的 token
+        """
+        self.fetch = fetch
+        self.refreshAhead = refreshAhead
+
+        self.token = None
+        self.expiresAt = None
+        self.obtainedAt = None
+
+        self.task = None
+
+        self.refreshes = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def set(self, token):
+        """
+        websocket 推送了新的 token, 或是刚刚刷新得到
+        """
+        self.token = token
+        self.expiresAt = parseJwtExpiry(token)
+        self.obtainedAt = time.time()
+
+    def expiresIn(self):
+        if self.expiresAt is None:
+            return None
+
+        return self.expiresAt - time.time()
+
+    async def get(self):
+        left = self.expiresIn()
+
+        if self.token is None or (left is not None and left <= 0):
+            return await self.refresh()
+
+        if left is not None and left <= self.refreshAhead:
+            self.__startRefresh()
+
+        return self.token
+
+    async def refresh(self, stale=None):
+        """
+        @param stale: 被服务端拒绝的 token; 已经有人换过新的 token 的话直接返回, 不再刷新
+        """
+        if stale is not None:
+            self.rejected += 1
+
+            if self.token != stale:
+                return self.token
+
+        # shield: 某个等待者被取消不影响其他等待者
+        return await asyncio.shield(self.__startRefresh())
+
+    def __startRefresh(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.__refresh())
+
+            # 后台刷新失败时没人等待, 取走异常避免 "exception was never retrieved"
+            self.task.add_done_callback(
+                lambda t: t.cancelled() or t.exception())
+
+        return self.task
+
+    async def __refresh(self):
+        try:
+            token = await self.fetch()
+        except BaseException:
+            self.failures += 1
+            raise
+        else:
+            self.refreshes += 1
+            self.set(token)
+
+            return token
+        finally:
+            self.task = None
+
+    def stats(self):
+        left = self.expiresIn()
+
+        return {
+            'age': round(time.time() - self.obtainedAt, 1) if self.obtainedAt else None,
+            'expiresIn': round(left, 1) if left is not None else None,
+            'refreshes': self.refreshes,
+            'rejected': self.rejected,
+            'failures': self.failures,
+        }
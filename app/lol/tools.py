@@ -3,12 +3,25 @@ import time
 import ctypes
 
 import asyncio
-from PyQt5.QtCore import QObject
-
-from .exceptions import SummonerRankInfoNotFound
-from ..common.config import cfg, Language
+from collections import Counter
+
+from .exceptions import SummonerRankInfoNotFound, DeadlineExceeded
+from .hedge import Hedger
+from .localization import localization
+from .models import GameSummary, queueAndMapNames, timeStampToStr, timeStampToShortStr, secsToStr
+from ..common.config import cfg
+from ..common.logger import logger
 from ..lol.connector import connector
 from ..common.signals import signalBus
+
+TAG = "Tools"
+
+# SGP 与 LCU 之间的战绩查询对冲
+summonerInfoHedger = Hedger()
+
+# 每个召唤师的战绩最终由哪条路径提供: sgp / lcu-hedge / lcu-fallback / lcu / failed
+summonerSources = Counter()
+
 SERVERS_NAME = {
     "NJ100": "联盟一区", "GZ100": "联盟二区", "CQ100": "联盟三区", "TJ100": "联盟四区", "TJ101": "联盟五区",
     "HN10": "黑色玫瑰", "HN1": "艾欧尼亚", "BGP2": "峡谷之巅"
@@ -23,71 +36,8 @@ SERVERS_SUBSET = {
 }
 
 
-class ToolsTranslator(QObject):
-    def __init__(self, parent=None):
-        super().__init__(parent=parent)
-
-        self.top = self.tr("TOP")
-        self.jungle = self.tr("JUG")
-        self.middle = self.tr("MID")
-        self.bottom = self.tr("BOT")
-        self.support = self.tr("SUP")
-
-        self.positionMap = {
-            "TOP": self.top,
-            "JUNGLE": self.jungle,
-            "MID": self.middle,
-            "ADC": self.bottom,
-            "SUPPORT": self.support
-        }
-
-        self.rankedSolo = self.tr('Ranked Solo')
-        self.rankedFlex = self.tr("Ranked Flex")
-
-        self.unranked = self.tr("Unranked")
-        self.unknown = self.tr("Unknown")
-
-
 def translateTier(orig: str, short=False) -> str:
-    if orig == '':
-        return "--"
-
-    maps = {
-        'Iron': ['坚韧黑铁', '黑铁'],
-        'Bronze': ['英勇黄铜', '黄铜'],
-        'Silver': ['不屈白银', '白银'],
-        'Gold': ['荣耀黄金', '黄金'],
-        'Platinum': ['华贵铂金', '铂金'],
-        'Emerald': ['流光翡翠', '翡翠'],
-        'Diamond': ['璀璨钻石', '钻石'],
-        'Master': ['超凡大师', '大师'],
-        'Grandmaster': ['傲世宗师', '宗师'],
-        'Challenger': ['最强王者', '王者'],
-    }
-
-    index = 1 if short else 0
-
-    if cfg.language.value == Language.ENGLISH:
-        return orig.capitalize()
-    else:
-        return maps[orig.capitalize()][index]
-
-
-def timeStampToStr(stamp):
-    """
-    @param stamp: Millisecond timestamp
-    """
-    timeArray = time.localtime(stamp / 1000)
-    return time.strftime("%Y/%m/%d %H:%M", timeArray)
-
-
-def timeStampToShortStr(stamp):
-    timeArray = time.localtime(stamp / 1000)
-    return time.strftime("%m/%d", timeArray)
-
-
-def secsToStr(secs):
-    return time.strftime("%M:%S", time.gmtime(secs))
+    return localization().tier(orig, short)
 
 
 async def getRecentTeammates(games, puuid):
@@ -184,110 +134,38 @@ async def parseSummonerData(summoner, rankTask, gameTask):
 
 
 async def parseGameData(game):
-    timeStamp = game["gameCreation"]  # 毫秒级时间戳
-    time = timeStampToStr(game['gameCreation'])
-    shortTime = timeStampToShortStr(game['gameCreation'])
-    gameId = game['gameId']
-    duration = secsToStr(game['gameDuration'])
-    queueId = game['queueId']
+    """
+    解析 LCU 战绩列表中的一局
 
-    nameAndMap = connector.manager.getNameMapByQueueId(queueId)
-    modeName = nameAndMap['name']
+    @return: `GameSummary`
+    """
+    summary = GameSummary.fromLcu(game, connector.manager)
+    await downloadGameIcons(summary)
 
-    if queueId != 0:
-        mapName = nameAndMap['map']
-    else:
-        mapName = connector.manager.getMapNameById(game['mapId'])
-
-    participant = game['participants'][0]
-    championId = participant['championId']
-    championIcon = await connector.getChampionIcon(championId)
-    spell1Id = participant['spell1Id']
-    spell2Id = participant['spell2Id']
-    spell1Icon = await connector.getSummonerSpellIcon(spell1Id)
-    spell2Icon = await connector.getSummonerSpellIcon(spell2Id)
-    stats = participant['stats']
-
-    champLevel = stats['champLevel']
-    kills = stats['kills']
-    deaths = stats['deaths']
-    assists = stats['assists']
-    itemIds = [
-        stats['item0'],
-        stats['item1'],
-        stats['item2'],
-        stats['item3'],
-        stats['item4'],
-        stats['item5'],
-        stats['item6'],
-    ]
+    return summary
 
-    itemIcons = [await connector.getItemIcon(itemId) for itemId in itemIds]
-    runeId = stats['perk0']
-    runeIcon = await connector.getRuneIcon(runeId)
 
-    cs = stats['totalMinionsKilled'] + stats['neutralMinionsKilled']
-    gold = stats['goldEarned']
-    remake = stats['gameEndedInEarlySurrender']
-    win = stats['win']
+async def downloadGameIcons(summary: GameSummary):
+    """
+    记录里只有 id, 界面按 id 拼出图标路径, 这里先确保图标都已经下载到本地
+    """
+    player = summary.player
 
-    timeline = participant['timeline']
-    lane = timeline['lane']
-    role = timeline['role']
+    await connector.getChampionIcon(player.championId)
+    await connector.getSummonerSpellIcon(player.spell1Id)
+    await connector.getSummonerSpellIcon(player.spell2Id)
 
-    position = None
+    for itemId in player.itemIds:
+        await connector.getItemIcon(itemId)
 
-    tt = ToolsTranslator()
-
-    if queueId in [420, 440]:
-        if lane == 'TOP':
-            position = tt.top
-        elif lane == "JUNGLE":
-            position = tt.jungle
-        elif lane == 'MIDDLE':
-            position = tt.middle
-        elif role == 'SUPPORT':
-            position = tt.support
-        elif lane == 'BOTTOM' and role == 'CARRY':
-            position = tt.bottom
-
-    return {
-        'queueId': queueId,
-        'gameId': gameId,
-        'time': time,
-        'shortTime': shortTime,
-        'name': modeName,
-        'map': mapName,
-        'duration': duration,
-        'remake': remake,
-        'win': win,
-        'championId': championId,
-        'championIcon': championIcon,
-        'spell1Icon': spell1Icon,
-        'spell2Icon': spell2Icon,
-        'champLevel': champLevel,
-        'kills': kills,
-        'deaths': deaths,
-        'assists': assists,
-        'itemIcons': itemIcons,
-        'runeIcon': runeIcon,
-        'cs': cs,
-        'gold': gold,
-        'timeStamp': timeStamp,
-        'position': position,
-    }
+    await connector.getRuneIcon(player.runeId)
 
 
 async def parseGameDetailData(puuid, game):
     queueId = game['queueId']
     mapId = game['mapId']
 
-    names = connector.manager.getNameMapByQueueId(queueId)
-    modeName = names['name']
-    if queueId != 0:
-        mapName = names['map']
-    else:
-        mapName = connector.manager.getMapNameById(mapId)
+    modeName, mapName = queueAndMapNames(connector.manager, queueId, mapId)
 
     def origTeam(teamId):
         return {
@@ -341,6 +219,15 @@ async def parseGameDetailData(puuid, game):
         teams[teamId]['towerKills'] = team['towerKills']
         teams[teamId]['inhibitorKills'] = team['inhibitorKills']
 
+    # 一次请求拿到所有人的隐私设置 (以及段位), 而不是每个人查一次
+    puuids = [p['player']['puuid'] for p in game['participantIdentities']]
+    summoners = await connector.getSummonersByPuuids(puuids)
+
+    getRankInfo = cfg.get(cfg.showTierInGameInfo)
+    # 只有斗魂竞技场直接显示积分, 其他模式只显示段位, 不用为胜点逐个查 ranked-stats
+    rankTiers = await connector.getRankedTiersByPuuids(
+        puuids, withLp=queueId == 1700) if getRankInfo else {}
+
     for participant in game['participantIdentities']:
         participantId = participant['participantId']
         summonerName = participant['player'].get(
@@ -351,7 +238,7 @@ async def parseGameDetailData(puuid, game):
         if summonerPuuid == '00000000-0000-0000-0000-000000000000':  # AI
             isPublic = True
         else:
-            t = await connector.getSummonerByPuuid(summonerPuuid)
+            t = summoners.get(summonerPuuid) or await connector.getSummonerByPuuid(summonerPuuid)
             isPublic = t.get("privacy") == "PUBLIC"
 
         for summoner in game['participants']:
@@ -406,37 +293,28 @@ async def parseGameDetailData(puuid, game):
                     await connector.getItemIcon(itemId) for itemId in itemIds
                 ]
 
-                getRankInfo = cfg.get(cfg.showTierInGameInfo)
-
                 tier = division = lp = rankIcon = ""
-                if getRankInfo:
-                    try:
-                        rank = await connector.getRankedStatsByPuuid(
-                            summonerPuuid)
-                    except SummonerRankInfoNotFound:
-                        ...
-                    else:
-                        rank = rank['queueMap']
+                rank = rankTiers.get(summonerPuuid)
 
-                        if queueId == 1700 and 'CHERRY' in rank:
-                            rankInfo = rank["CHERRY"]
-                            lp = rankInfo['ratedRating']
-                        else:
-                            rankInfo = rank[
-                                'RANKED_FLEX_SR'] if queueId == 440 else rank['RANKED_SOLO_5x5']
+                if getRankInfo and rank is not None:
+                    if queueId == 1700 and 'CHERRY' in rank:
+                        lp = rank["CHERRY"]['lp']
+                    else:
+                        rankInfo = rank.get('RANKED_FLEX_SR' if queueId == 440 else 'RANKED_SOLO_5x5',
+                                            {'tier': '', 'division': 'NA', 'lp': ''})
 
-                            tier = rankInfo['tier']
-                            division = rankInfo['division']
-                            lp = rankInfo['leaguePoints']
+                        tier = rankInfo['tier']
+                        division = rankInfo['division']
+                        lp = rankInfo['lp']
 
-                            if tier == '':
-                                rankIcon = 'app/resource/images/unranked.png'
-                            else:
-                                rankIcon = f'app/resource/images/{tier.lower()}.png'
-                                tier = translateTier(tier, True)
+                        if tier == '':
+                            rankIcon = 'app/resource/images/unranked.png'
+                        else:
+                            rankIcon = f'app/resource/images/{tier.lower()}.png'
+                            tier = translateTier(tier, True)
 
-                            if division == 'NA':
-                                division = ''
+                        if division == 'NA':
+                            division = ''
 
                 item = {
                     'summonerName': summonerName,
@@ -581,24 +459,23 @@ def getRecentChampions(games):
 
 def parseRankInfo(info):
     """
-    解析 `connector.getRankedStatsByPuuid()` 的数据。
-
+    解析 `connector.getRankedTiersByPuuids()` 中单个召唤师的数据。
 
-    api: `/lol-ranked/v1/ranked-stats/{puuid}`
 
-    :param info: 接口返回值, 允许为空（接口异常时抛出 `SummonerRankInfoNotFound`, 需要捕获置空）
+    :param info: {queueType: {'tier', 'division', 'lp'}}, 允许为空（查不到时置空）
 
     """
-    tt = ToolsTranslator()
+    tt = localization()
 
     soloIcon = flexIcon = "app/resource/images/UNRANKED.svg"
     soloTier = flexTier = tt.unknown
     soloDivision = flexDivision = ""
     soloRankInfo = flexRankInfo = {"leaguePoints": ""}
 
-    if info:
-        soloRankInfo = info["queueMap"]["RANKED_SOLO_5x5"]
-        flexRankInfo = info["queueMap"]["RANKED_FLEX_SR"]
+    if info is not None:
+        unranked = {"tier": "", "division": "NA", "lp": ""}
+        soloRankInfo = info.get("RANKED_SOLO_5x5", unranked)
+        flexRankInfo = info.get("RANKED_FLEX_SR", unranked)
 
         soloTier = soloRankInfo["tier"]
         soloDivision = soloRankInfo["division"]
@@ -629,13 +506,13 @@ def parseRankInfo(info):
             "tier": soloTier,
             "icon": soloIcon,
             "division": soloDivision,
-            "lp": soloRankInfo["leaguePoints"],
+            "lp": soloRankInfo.get("lp", ""),
         },
         "flex": {
             "tier": flexTier,
             "icon": flexIcon,
             "division": flexDivision,
-            "lp": flexRankInfo["leaguePoints"],
+            "lp": flexRankInfo.get("lp", ""),
         },
     }
 
@@ -643,7 +520,7 @@ def parseRankInfo(info):
 def parseRankInfoFromSGP(info):
     '''解析来自 `connector.getRankedStatsByPuuidViaSGP()` 的数据'''
 
-    tt = ToolsTranslator()
+    tt = localization()
 
     soloIcon = flexIcon = "app/resource/images/UNRANKED.svg"
     soloTier = flexTier = tt.unknown
@@ -748,7 +625,7 @@ def parseDetailRankInfo(rankInfo):
     flexWinRate = flexWins * 100 // flexTotal if flexTotal != 0 else 0
     flexLp = flexRankInfo['leaguePoints']
 
-    pt = ToolsTranslator()
+    pt = localization()
 
     return [
         [
@@ -810,21 +687,8 @@ async def parseAllyGameInfo(session, currentSummonerId, useSGP=False):
     # 排位会有预选位
     isRank = bool(session["myTeam"][0]["assignedPosition"])
 
-    if useSGP and connector.isInMainland():
-        # 如果是国服就优先尝试 SGP
-        try:
-            tasks = [getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId)
-                     for item in session['myTeam']]
-            summoners = await asyncio.gather(*tasks)
-        except:
-            tasks = [parseSummonerGameInfo(item, isRank, currentSummonerId)
-                     for item in session['myTeam']]
-            summoners = await asyncio.gather(*tasks)
-
-    else:
-        tasks = [parseSummonerGameInfo(item, isRank, currentSummonerId)
-                 for item in session['myTeam']]
-        summoners = await asyncio.gather(*tasks)
+    summoners = await getTeamGamesInfo(
+        session['myTeam'], isRank, currentSummonerId, useSGP)
 
     summoners = [summoner for summoner in summoners if summoner]
 
@@ -863,22 +727,8 @@ async def parseGameInfoByGameflowSession(session, currentSummonerId, side, useSG
     else:
         team, _ = separateTeams(data, currentSummonerId)
 
-    if useSGP and connector.isInMainland():
-        # 如果是国服就优先尝试 SGP
-        try:
-            tasks = [getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId)
-                     for item in team]
-            summoners = await asyncio.gather(*tasks)
-
-        except:
-            tasks = [parseSummonerGameInfo(item, isRank, currentSummonerId)
-                     for item in team]
-            summoners = await asyncio.gather(*tasks)
-
-    else:
-        tasks = [parseSummonerGameInfo(item, isRank, currentSummonerId)
-                 for item in team]
-        summoners = await asyncio.gather(*tasks)
+    summoners = await getTeamGamesInfo(
+        team, isRank, currentSummonerId, useSGP)
 
     summoners = [summoner for summoner in summoners if summoner]
 
@@ -991,7 +841,15 @@ async def parseGamesDataConcurrently(games):
     return await asyncio.gather(*tasks)
 
 
-async def parseSummonerGameInfo(item, isRank, currentSummonerId):
+async def parseSummonerGameInfo(item, isRank, currentSummonerId, summoner=None,
+                                rankTiers=None):
+    """
+    使用 LCU 接口取战绩信息
+
+    @param summoner: 整队批量查到的召唤师信息, 为 None 时单独查询
+    @param rankTiers: 整队批量查询段位的 Future (结果同 `connector.getRankedTiersByPuuids`),
+                      在取完战绩之后才等待它; 为 None、失败或其中没有这个召唤师时单独查询
+    """
     summonerId = item.get('summonerId', None)
 
     if item.get('nameVisibilityType') == 'HIDDEN':
@@ -1000,7 +858,8 @@ async def parseSummonerGameInfo(item, isRank, currentSummonerId):
     if summonerId == 0 or summonerId == None:
         return None
 
-    summoner = await connector.getSummonerById(summonerId)
+    if summoner is None:
+        summoner = await connector.getSummonerById(summonerId)
 
     championId = item.get('championId') or 0
     icon = await connector.getChampionIcon(championId)
@@ -1010,13 +869,6 @@ async def parseSummonerGameInfo(item, isRank, currentSummonerId):
     if puuid == "00000000-0000-0000-0000-000000000000" or not puuid:
         return None
 
-    try:
-        origRankInfo = await connector.getRankedStatsByPuuid(puuid)
-    except SummonerRankInfoNotFound:
-        origRankInfo = None
-
-    rankInfo = parseRankInfo(origRankInfo)
-
     try:
         origGamesInfo = await connector.getSummonerGamesByPuuid(
             puuid, 0, 14)
@@ -1042,8 +894,6 @@ async def parseSummonerGameInfo(item, isRank, currentSummonerId):
                  for game in origGamesInfo["games"][:11]]
         gamesInfo = await asyncio.gather(*tasks)
 
-    _, kill, deaths, assists, _, _ = parseGames(gamesInfo)
-
     teammatesInfo = [
         getTeammates(
             await connector.getGameDetailByGameId(game["gameId"]),
@@ -1051,42 +901,28 @@ async def parseSummonerGameInfo(item, isRank, currentSummonerId):
         ) for game in gamesInfo[:1]  # 避免空报错, 查上一局的队友(对手)
     ]
 
-    recentlyChampionName = ""
-    fateFlag = None
+    tiers = await rankTiers if rankTiers is not None else None
 
-    if teammatesInfo:  # 判个空, 避免太久没有打游戏的玩家或新号引发异常
-        if currentSummonerId in [t['summonerId'] for t in teammatesInfo[0]['summoners']]:
-            # 上把队友
-            fateFlag = "ally"
-        elif currentSummonerId in [t['summonerId'] for t in teammatesInfo[0]['enemies']]:
-            # 上把对面
-            fateFlag = "enemy"
-        recentlyChampionId = max(
-            teammatesInfo and teammatesInfo[0]['championId'], 0)  # 取不到时是-1, 如果-1置为0
-        recentlyChampionName = connector.manager.champs.get(
-            recentlyChampionId)
+    # 批量查询失败或漏掉了这个召唤师时单独查一次
+    if tiers is None or puuid not in tiers:
+        tiers = await connector.getRankedTiersByPuuids([puuid], withLp=True)
 
-    return {
+    rankInfo = parseRankInfo(tiers.get(puuid))
+
+    # 适用于 LCU API 返回值
+    summoner = {
         "name": summoner.get("gameName") or summoner.get("internalName"),
         'tagLine': summoner.get("tagLine"),
-        "icon": icon,
-        'championId': championId,
         "level": summoner["summonerLevel"],
-        "rankInfo": rankInfo,
-        "gamesInfo": gamesInfo,
         "xpSinceLastLevel": summoner["xpSinceLastLevel"],
         "xpUntilNextLevel": summoner["xpUntilNextLevel"],
-        "puuid": puuid,
         "summonerId": summonerId,
-        "kda": [kill, deaths, assists],
-        "cellId": item.get("cellId"),
-        "selectedPosition": item.get("selectedPosition"),
-        "fateFlag": fateFlag,
         "isPublic": summoner["privacy"] == "PUBLIC",
-        # 最近游戏的英雄 (用于上一局与与同一召唤师游玩之后显示)
-        "recentlyChampionName": recentlyChampionName
     }
 
+    return buildSummonerGameInfo(item, puuid, icon, summoner, rankInfo,
+                                 gamesInfo, teammatesInfo, currentSummonerId)
+
 
 async def getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId):
     '''
@@ -1111,6 +947,9 @@ async def getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId):
 
     rankInfo = parseRankInfoFromSGP(origRankInfo)
 
+    # SGP 的召唤师信息里没有 tagLine, 需要从对局记录里拿
+    summonerName, tagLine = summoner.get("name"), None
+
     try:
         origGamesInfo = await connector.getSummonerGamesByPuuidViaSGP(puuid, 0, 14)
 
@@ -1129,16 +968,15 @@ async def getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId):
 
                 begIdx = endIdx + 1
     except:
-        gamesInfo = []
-    else:
+        origGamesInfo = {'games': []}
+
+    if origGamesInfo['games']:
         summonerName, tagLine = getNameTagLineFromGame(
             origGamesInfo['games'][0], puuid)
 
-        tasks = [parseGamesDataFromSGP(game, puuid)
-                 for game in origGamesInfo["games"][:11]]
-        gamesInfo = await asyncio.gather(*tasks)
-
-    _, kill, deaths, assists, _, _ = parseGames(gamesInfo)
+    tasks = [parseGamesDataFromSGP(game, puuid)
+             for game in origGamesInfo["games"][:11]]
+    gamesInfo = await asyncio.gather(*tasks)
 
     teammatesInfo = [
         getTeammatesFromSGPGame(
@@ -1147,6 +985,31 @@ async def getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId):
         ) for game in origGamesInfo['games'][:1]  # 避免空报错, 查上一局的队友(对手)
     ]
 
+    # 适用于 SGP API 返回值
+    summoner = {
+        "name": summonerName,
+        'tagLine': tagLine,
+        "level": summoner["level"],
+        "xpSinceLastLevel": summoner["expPoints"],
+        "xpUntilNextLevel": summoner["expToNextLevel"],
+        "summonerId": summoner['id'],
+        "isPublic": summoner["privacy"] == "PUBLIC",
+    }
+
+    return buildSummonerGameInfo(item, puuid, icon, summoner, rankInfo,
+                                 gamesInfo, teammatesInfo, currentSummonerId)
+
+
+def buildSummonerGameInfo(item, puuid, icon, summoner, rankInfo, gamesInfo, teammatesInfo, currentSummonerId):
+    """
+    LCU 与 SGP 两条路径的数据归一化之后, 共用这里的解析
+
+    @param summoner: 归一化之后的召唤师信息, 字段见 `parseSummonerGameInfo`
+    @param gamesInfo: 由 `parseGameData` / `parseGamesDataFromSGP` 得到的 `GameSummary` 列表
+    @param teammatesInfo: 由 `getTeammates` / `getTeammatesFromSGPGame` 得到的上一局队友信息
+    """
+    _, kill, deaths, assists, _, _ = parseGames(gamesInfo)
+
     recentlyChampionName = ""
     fateFlag = None
 
@@ -1162,51 +1025,151 @@ async def getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId):
         recentlyChampionName = connector.manager.champs.get(
             recentlyChampionId)
 
-    # 适用于 LCU API 返回值
-    # return {
-    #     "name": summoner.get("gameName"),
-    #     'tagLine': summoner.get('tagLine'),
-    #     "icon": icon,
-    #     'championId': championId,
-    #     "level": summoner["summonerLevel"],
-    #     "rankInfo": rankInfo,
-    #     "gamesInfo": gamesInfo,
-    #     "xpSinceLastLevel": summoner["xpSinceLastLevel"],
-    #     "xpUntilNextLevel": summoner["xpUntilNextLevel"],
-    #     "puuid": puuid,
-    #     "summonerId": summoner['summonerId'],
-    #     "kda": [kill, deaths, assists],
-    #     "cellId": item.get("cellId"),
-    #     "selectedPosition": item.get("selectedPosition"),
-    #     "fateFlag": fateFlag,
-    #     "isPublic": summoner["privacy"] == "PUBLIC",
-    #     # 最近游戏的英雄 (用于上一局与与同一召唤师游玩之后显示)
-    #     "recentlyChampionName": recentlyChampionName
-    # }
-
-    # 适用于 SGP API 返回值
     return {
-        "name": summonerName,
-        'tagLine': tagLine,
+        "name": summoner["name"],
+        'tagLine': summoner["tagLine"],
         "icon": icon,
-        'championId': championId,
+        'championId': item.get('championId') or 0,
         "level": summoner["level"],
         "rankInfo": rankInfo,
         "gamesInfo": gamesInfo,
-        "xpSinceLastLevel": summoner["expPoints"],
-        "xpUntilNextLevel": summoner["expToNextLevel"],
+        "xpSinceLastLevel": summoner["xpSinceLastLevel"],
+        "xpUntilNextLevel": summoner["xpUntilNextLevel"],
         "puuid": puuid,
-        "summonerId": summoner['id'],
+        "summonerId": summoner["summonerId"],
         "kda": [kill, deaths, assists],
         "cellId": item.get("cellId"),
         "selectedPosition": item.get("selectedPosition"),
         "fateFlag": fateFlag,
-        "isPublic": summoner["privacy"] == "PUBLIC",
+        "isPublic": summoner["isPublic"],
         # 最近游戏的英雄 (用于上一局与与同一召唤师游玩之后显示)
         "recentlyChampionName": recentlyChampionName
     }
 
 
+async def getSummonerGamesInfoHedged(item, isRank, currentSummonerId):
+    """
+    优先使用 SGP 取战绩信息, SGP 迟迟不返回时同时用 LCU 取一份, 用先返回的那份
+
+    @return: (战绩信息, 数据来源)
+    """
+    res, fromBackup = await summonerInfoHedger.run(
+        lambda: getSummonerGamesInfoViaSGP(item, isRank, currentSummonerId),
+        lambda: parseSummonerGameInfo(item, isRank, currentSummonerId))
+
+    return res, "lcu-hedge" if fromBackup else "sgp"
+
+
+async def prefetchSummoners(team):
+    """
+    批量查询一队召唤师的信息, 失败了也没关系, 之后会逐个查询
+
+    @return: {summonerId: summoner}
+    """
+    try:
+        return await connector.getSummonersByIds(
+            [item.get('summonerId') for item in team])
+    except (asyncio.CancelledError, DeadlineExceeded):
+        raise
+    except BaseException:
+        return {}
+
+
+async def prefetchRankTiers(summoners):
+    """
+    批量查询一队召唤师的段位, 失败时返回 None, 之后会逐个查询
+    """
+    try:
+        return await connector.getRankedTiersByPuuids(
+            [s.get('puuid') for s in summoners], withLp=True)
+    except (asyncio.CancelledError, DeadlineExceeded):
+        raise
+    except BaseException:
+        return None
+
+
+async def gatherSummonerGameInfo(team, isRank, currentSummonerId, returnExceptions=False):
+    """
+    使用 LCU 取一队召唤师的战绩信息
+
+    先批量查一次召唤师, 之后每个人直接使用查到的信息; 段位的批量查询与每个人的战绩同时进行,
+    不占用关键路径
+    """
+    summoners = await prefetchSummoners(team)
+    rankTiers = asyncio.ensure_future(prefetchRankTiers(summoners.values()))
+
+    tasks = [parseSummonerGameInfo(item, isRank, currentSummonerId,
+                                   summoners.get(item.get('summonerId')), rankTiers)
+             for item in team]
+
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=returnExceptions)
+    finally:
+        rankTiers.cancel()
+
+
+async def getTeamGamesInfo(team, isRank, currentSummonerId, useSGP=False):
+    """
+    取一整队召唤师的战绩信息
+
+    国服优先走 SGP; 某个召唤师 SGP 失败时, 只把这个召唤师交给 LCU 重新获取,
+    其他召唤师已经拿到的结果保留. LCU 也失败的召唤师会被丢掉, 只返回其余的部分结果,
+    全部失败时才抛出异常
+    """
+    if not (useSGP and connector.isSGPAvailable()):
+        summonerSources['lcu'] += len(team)
+
+        return await gatherSummonerGameInfo(team, isRank, currentSummonerId)
+
+    # 如果是国服就优先尝试 SGP
+    tasks = [getSummonerGamesInfoHedged(item, isRank, currentSummonerId)
+             for item in team]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    summoners = [None] * len(team)
+    failed = []
+
+    for i, res in enumerate(results):
+        if isinstance(res, (asyncio.CancelledError, DeadlineExceeded)):
+            # 没人要这个结果了, 不用再降级
+            raise res
+
+        if isinstance(res, BaseException):
+            failed.append(i)
+        else:
+            summoners[i], source = res
+            summonerSources[source] += 1
+
+    if failed:
+        retried = await gatherSummonerGameInfo(
+            [team[i] for i in failed], isRank, currentSummonerId, returnExceptions=True)
+
+        errors = []
+
+        for i, res in zip(failed, retried):
+            if isinstance(res, (asyncio.CancelledError, DeadlineExceeded)):
+                raise res
+
+            if isinstance(res, BaseException):
+                errors.append(res)
+                summonerSources['failed'] += 1
+            else:
+                summoners[i] = res
+                summonerSources['lcu-fallback'] += 1
+
+        if len(errors) == len(team):
+            raise errors[0]
+
+        if errors:
+            logger.warning(
+                f"{len(errors)}/{len(team)} summoners failed on both SGP and LCU: {errors}", TAG)
+
+    logger.info(
+        f"summoner sources: {dict(summonerSources)}, hedge: {summonerInfoHedger.stats()}", TAG)
+
+    return summoners
+
+
 def getTeammatesFromSGPGame(game, puuid):
     json = game['json']
     queueId = json['queueId']
@@ -1262,105 +1225,13 @@ def getTeammatesFromSGPGame(game, puuid):
 async def parseGamesDataFromSGP(game, puuid):
     """
     解析由 SGP 接口得到的具体到某一局的对局记录信息
-    """
-
-    game = game['json']
 
-    timeStamp = game["gameCreation"]  # 毫秒级时间戳
-    time = timeStampToStr(game['gameCreation'])
-    shortTime = timeStampToShortStr(game['gameCreation'])
-    gameId = game['gameId']
-    duration = secsToStr(game['gameDuration'])
-    queueId = game['queueId']
-
-    nameAndMap = connector.manager.getNameMapByQueueId(queueId)
-    modeName = nameAndMap['name']
-
-    if queueId != 0:
-        mapName = nameAndMap['map']
-    else:
-        mapName = connector.manager.getMapNameById(game['mapId'])
-
-    participant = None
-    for p in game['participants']:
-        if p['puuid'] == puuid:
-            participant = p
-
-    championId = participant['championId']
-    championIcon = await connector.getChampionIcon(championId)
-    spell1Id = participant['spell1Id']
-    spell2Id = participant['spell2Id']
-    spell1Icon = await connector.getSummonerSpellIcon(spell1Id)
-    spell2Icon = await connector.getSummonerSpellIcon(spell2Id)
-
-    champLevel = participant['champLevel']
-    kills = participant['kills']
-    deaths = participant['deaths']
-    assists = participant['assists']
-
-    itemIds = [
-        participant['item0'],
-        participant['item1'],
-        participant['item2'],
-        participant['item3'],
-        participant['item4'],
-        participant['item5'],
-        participant['item6'],
-    ]
-
-    itemIcons = [await connector.getItemIcon(itemId) for itemId in itemIds]
-    runeId = participant['perks']['styles'][0]['selections'][0]['perk']
-    runeIcon = await connector.getRuneIcon(runeId)
-
-    cs = participant['totalMinionsKilled'] + \
-        participant['neutralMinionsKilled']
-    gold = participant['goldEarned']
-    remake = participant['gameEndedInEarlySurrender']
-    win = participant['win']
-
-    lane = participant['lane']
-    role = participant['role']
-
-    position = None
-    tt = ToolsTranslator()
-
-    if queueId in [420, 440]:
-        if lane == 'TOP':
-            position = tt.top
-        elif lane == "JUNGLE":
-            position = tt.jungle
-        elif lane == 'MIDDLE':
-            position = tt.middle
-        elif role == 'SUPPORT':
-            position = tt.support
-        elif lane == 'BOTTOM' and role == 'CARRY':
-            position = tt.bottom
+    @return: `GameSummary`, 与 `parseGameData` 的相同
+    """
+    summary = GameSummary.fromSgp(game, puuid, connector.manager)
+    await downloadGameIcons(summary)
 
-    return {
-        'queueId': queueId,
-        'gameId': gameId,
-        'time': time,
-        'shortTime': shortTime,
-        'name': modeName,
-        'map': mapName,
-        'duration': duration,
-        'remake': remake,
-        'win': win,
-        'championId': championId,
-        'championIcon': championIcon,
-        'spell1Icon': spell1Icon,
-        'spell2Icon': spell2Icon,
-        'champLevel': champLevel,
-        'kills': kills,
-        'deaths': deaths,
-        'assists': assists,
-        'itemIcons': itemIcons,
-        'runeIcon': runeIcon,
-        'cs': cs,
-        'gold': gold,
-        'timeStamp': timeStamp,
-        'position': position,
-    }
+    return summary
 
 
 def getNameTagLineFromGame(game, puuid):
@@ -0,0 +1,239 @@
+import asyncio
+import time
+
+from app.lol.exceptions import CircuitOpen, DeadlineExceeded
+
+
+class TokenBucket:
+    """
+    令牌桶限速, 每秒补充 `rate` 个令牌, 最多攒 `burst` 个
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+
+        # 因为没有令牌而等待的总时间
+        self.waited = 0.
+
+    def __refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    async def acquire(self):
+        self.__refill()
+
+        while self.tokens < 1:
+            delay = (1 - self.tokens) / self.rate
+            self.waited += delay
+
+            await asyncio.sleep(delay)
+            self.__refill()
+
+        self.tokens -= 1
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - CLOSED:    正常放行, 连续失败 `threshold` 次后转为 OPEN
+    - OPEN:      直接拒绝, 经过 `cooldown` 秒后转为 HALF_OPEN
+    - HALF_OPEN: 只放行一个探测请求, 成功则恢复 CLOSED, 失败则重新 OPEN,
+                 且冷却时间翻倍 (最多 `maxCooldown` 秒)
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold=5, cooldown=10., maxCooldown=120.):
+        self.threshold = threshold
+        self.baseCooldown = cooldown
+        self.maxCooldown = maxCooldown
+
+        self.reset()
+
+        self.opens = 0
+        self.rejected = 0
+
+    def reset(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.baseCooldown
+        self.openedAt = 0
+        self.probing = False
+
+    def remaining(self):
+        """
+        距离可以探测还要多少秒
+        """
+        return max(0., self.openedAt + self.cooldown - time.monotonic())
+
+    def available(self):
+        """
+        当前是否值得尝试, 用于调用者提前选择其他的数据源
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            return self.remaining() == 0
+
+        return not self.probing
+
+    def allow(self):
+        if self.state == self.OPEN and self.remaining() == 0:
+            self.state = self.HALF_OPEN
+
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def onSuccess(self):
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+            self.cooldown = self.baseCooldown
+            self.state = self.CLOSED
+
+        self.failures = 0
+
+    def onFailure(self):
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+            self.cooldown = min(self.maxCooldown, self.cooldown * 2)
+            self.__open()
+            return
+
+        self.failures += 1
+
+        if self.state == self.CLOSED and self.failures >= self.threshold:
+            self.__open()
+
+    def onCancel(self):
+        # 探测请求被取消了, 让下一个请求重新探测
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+
+    def __open(self):
+        self.state = self.OPEN
+        self.openedAt = time.monotonic()
+        self.opens += 1
+
+
+class Upstream:
+    """
+    一个上游服务, 带有自己的限速与熔断
+
+    用法:
+
+        async with upstreams['sgp'].guard() as guard:
+            res = await session.get(...)
+            guard.status = res.status
+    """
+
+    def __init__(self, name, rate, burst, threshold, cooldown):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(threshold, cooldown)
+
+    def available(self):
+        return self.breaker.available()
+
+    def reset(self):
+        self.breaker.reset()
+
+    def guard(self):
+        return UpstreamGuard(self)
+
+    def stats(self):
+        return {
+            'state': self.breaker.state,
+            'opens': self.breaker.opens,
+            'rejected': self.breaker.rejected,
+            'throttled': round(self.bucket.waited, 3),
+        }
+
+
+class UpstreamGuard:
+    def __init__(self, upstream: Upstream):
+        self.upstream = upstream
+        self.status = None
+
+    async def __aenter__(self):
+        breaker = self.upstream.breaker
+
+        if not breaker.allow():
+            raise CircuitOpen(self.upstream.name, breaker.remaining())
+
+        try:
+            await self.upstream.bucket.acquire()
+        except asyncio.CancelledError:
+            breaker.onCancel()
+            raise
+
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        breaker = self.upstream.breaker
+
+        # 调用者取消或自己的截止时间到了, 不是上游的问题; 接口超时 (asyncio.TimeoutError) 则算失败
+        if excType is asyncio.CancelledError or excType is DeadlineExceeded:
+            breaker.onCancel()
+        elif excType is not None or (self.status is not None
+                                     and (self.status >= 500 or self.status == 429)):
+            breaker.onFailure()
+        else:
+            breaker.onSuccess()
+
+
+# 每个上游的 (每秒请求数, 突发上限, 熔断阈值, 冷却秒数)
+
+def clientUpstreams():
+    """
+    每个客户端 (LolClientConnector) 各自的上游: 不同客户端的 LCU 互不相干,
+    也可能在不同的大区, 熔断状态不能共用
+    """
+    return {
+        # 本地客户端, 并发另有 AdaptiveLimiter 控制, 这里只兜底
+        'lcu': Upstream('lcu', 100, 100, 20, 2.),
+
+        # 腾讯 SGP, 国服才有
+        'sgp': Upstream('sgp', 20, 40, 5, 30.),
+    }
+
+
+# 所有客户端共用的第三方服务
+upstreams = {
+    'opgg': Upstream('opgg', 10, 20, 5, 30.),
+
+    # 大乱斗之家 (AramBuff)
+    'jddld': Upstream('jddld', 1, 2, 3, 60.),
+
+    # 英雄别名 (ChampionAlias)
+    'gtimg': Upstream('gtimg', 2, 4, 3, 60.),
+}
+
+
+def upstreamMiddleware(getUpstream):
+    """
+    HTTP 调用链中的限速与熔断, 放在 `timeoutMiddleware` 之外, 超时才会被记为上游的失败
+
+    @param getUpstream: (req) -> Upstream
+    """
+    async def middleware(req, next):
+        async with getUpstream(req).guard() as guard:
+            res = await next(req)
+            guard.status = res.status
+
+        return res
+
+    return middleware
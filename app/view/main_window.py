@@ -33,14 +33,20 @@ from app.components.temp_system_tray_menu import TmpSystemTrayMenu
 from app.common.icons import Icon
 from app.common.config import cfg, VERSION, BETA
 from app.common.logger import logger
+from app.common.http import hub
 from app.common.signals import signalBus
 from app.components.message_box import (UpdateMessageBox, NoticeMessageBox,
                                         WaitingForLolMessageBox, ExceptionMessageBox,
                                         ChangeDpiMessageBox)
 from app.lol.exceptions import (SummonerGamesNotFound, RetryMaximumAttempts,
-                                SummonerNotFound, SummonerNotInGame, SummonerRankInfoNotFound)
+                                SummonerNotFound, SummonerNotInGame, SummonerRankInfoNotFound,
+                                DeadlineExceeded)
 from app.lol.listener import (LolProcessExistenceListener, StoppableThread)
-from app.lol.connector import connector
+from app.lol.connector import connector, connectorPool
+from app.lol.startup import Stopwatch
+from app.lol.scheduler import Priority, priority
+from app.lol.deadline import deadline
+from app.lol.router import Coalescer
 from app.lol.tools import (parseAllyGameInfo, parseGameInfoByGameflowSession,
                            getAllyOrderByGameRole, getTeamColor, autoBan, autoPick,
                            autoComplete, autoSwap, autoTrade, ChampionSelection,
@@ -219,6 +225,7 @@ class MainWindow(FluentWindow):
         signalBus.lolClientStarted.connect(self.__onLolClientStarted)
         signalBus.lolClientEnded.connect(self.__onLolClientEnded)
         signalBus.lolClientChanged.connect(self.__onLolClientChanged)
+        signalBus.lolClientPidsChanged.connect(self.__onLolClientPidsChanged)
         signalBus.terminateListeners.connect(self.__terminateListeners)
 
         # From connector
@@ -226,8 +233,10 @@ class MainWindow(FluentWindow):
             self.__onCurrentSummonerProfileChanged)
         signalBus.gameStatusChanged.connect(
             self.__onGameStatusChanged)
-        signalBus.champSelectChanged.connect(
-            self.__onChampSelectChanged)
+        # 选人阶段的 session 推送很密集, 处理不过来时只处理最新的那份
+        self.champSelectCoalescer = Coalescer(
+            self.__onChampSelectChanged, "champ select")
+        signalBus.champSelectChanged.connect(self.champSelectCoalescer.submit)
         signalBus.lcuApiExceptionRaised.connect(
             self.__onShowLcuConnectError)
         signalBus.getCmdlineError.connect(
@@ -468,25 +477,36 @@ class MainWindow(FluentWindow):
     @asyncSlot(int)
     async def __onLolClientStarted(self, pid):
         logger.info(f"League of Legends client started: {pid}", TAG)
+
+        # 从客户端启动到界面解锁的各段耗时, connector 内部的细分见 connector 的日志
+        watch = Stopwatch(f"client {pid} ready")
+
         res = await self.__startConnector(pid)
         if not res:
             return
+        watch.lap("connector")
 
         await opgg.start()
         self.checkAndSwitchTo(self.careerInterface)
         self.isClientProcessRunning = True
+        watch.lap("opgg")
 
         await self.__changeCareerToCurrentSummoner()
         await self.__updateAvatarIconName()
+        watch.lap("summoner")
 
         self.startInterface.hideLoadingPage()
 
         folder, status = await asyncio.gather(connector.getInstallFolder(),
                                               connector.getGameStatus())
+        watch.lap("folder & status")
 
         self.__setLolInstallFolder(folder)
 
-        asyncio.create_task(self.auxiliaryFuncInterface.initChampionList())
+        # 预加载任务以 PREFETCH 优先级运行, 不抢用户操作触发的请求
+        with priority(Priority.PREFETCH):
+            asyncio.create_task(
+                self.auxiliaryFuncInterface.initChampionList())
 
         self.auxiliaryFuncInterface.lockConfigCard.loadNowMode()
 
@@ -494,7 +514,8 @@ class MainWindow(FluentWindow):
         aramInitT = asyncio.create_task(AramBuff.checkAndUpdate())
         championsInit = asyncio.create_task(ChampionAlias.checkAndUpdate())
 
-        asyncio.create_task(self.opggWindow.initWindow())
+        with priority(Priority.PREFETCH):
+            asyncio.create_task(self.opggWindow.initWindow())
         self.opggWindow.setHomeInterfaceEnabled(False)
 
         # ---- 240413 ---- By Hpero4
@@ -524,6 +545,9 @@ class MainWindow(FluentWindow):
         # ---- 240413 ---- By Hpero4
 
         self.__unlockInterface()
+        watch.lap("unlock")
+        logger.info(watch.report(), TAG)
+
         await asyncio.gather(championsInit, aramInitT)
         await self.__onGameStatusChanged(status)
 
@@ -532,12 +556,11 @@ class MainWindow(FluentWindow):
 
     async def __startConnector(self, pid):
         try:
-            await connector.start(pid)
+            await connectorPool.activate(pid)
             return True
         except RetryMaximumAttempts:
             # 若超出最大尝试次数, 则认为 lcu 未就绪 (如大区排队中),
-            # 捕获到该异常时不抛出, 等待下一个 emit
-            await connector.close()
+            # 捕获到该异常时不抛出, 等待下一个 emit (启动失败的实例已经移出连接池)
 
             if self.processListener.isRunning():
                 self.processListener.runningPid = 0
@@ -549,7 +572,10 @@ class MainWindow(FluentWindow):
     @asyncSlot(int)
     async def __onLolClientChanged(self, pid):
         logger.critical(f"League of Legends client changed: {pid}", TAG)
-        await self.__onLolClientEnded()
+
+        # 原来的客户端如果还开着 (手动切换), 在连接池中保持连接, 切回来时不用重新初始化;
+        # 已经关掉的由 __onLolClientPidsChanged 释放
+        await self.__resetInterface()
         self.processListener.runningPid = pid
         await self.__onLolClientStarted(pid)
 
@@ -557,11 +583,22 @@ class MainWindow(FluentWindow):
     async def __onLolClientEnded(self):
         logger.critical("League of Legends client ended", TAG)
 
+        await connectorPool.closeAll()
+        await self.__resetInterface()
+
+    @asyncSlot(list)
+    async def __onLolClientPidsChanged(self, pids):
+        logger.info(f"League of Legends clients: {pids}", TAG)
+
+        # 客户端全部关闭时由 __onLolClientEnded 处理, 这里不提前释放当前绑定的实例
+        if pids:
+            await connectorPool.sync(pids)
+
+    async def __resetInterface(self):
         if self.searchInterface.gameLoadingTask:
             self.searchInterface.puuid = 0
             self.searchInterface.gameLoadingTask = None
 
-        await connector.close()
         await opgg.close()
 
         self.isClientProcessRunning = False
@@ -733,6 +770,9 @@ class MainWindow(FluentWindow):
             self.__terminateListeners()
             self.opggWindow.close()
 
+            await connectorPool.closeAll()
+            await hub.close()
+
             return super().closeEvent(a0)
         else:
             a0.ignore()
@@ -862,7 +902,6 @@ class MainWindow(FluentWindow):
         self.checkAndSwitchTo(self.gameInfoInterface)
 
     # 英雄选择时，英雄改变 / 楼层改变时触发
-    @asyncSlot(dict)
     async def __onChampSelectChanged(self, data):
         data = data['data']
 
@@ -911,8 +950,14 @@ class MainWindow(FluentWindow):
 
         # 将敌方的召唤师基本信息绘制上去
         async def paintEnemySummonersInfo():
-            info = await parseGameInfoByGameflowSession(
-                session, currentSummonerId, 'enemy', useSGP=True)
+            # 载入界面结束之后才画出来就没什么意义了, 超时的请求直接丢掉
+            try:
+                with deadline(90):
+                    info = await parseGameInfoByGameflowSession(
+                        session, currentSummonerId, 'enemy', useSGP=True)
+            except DeadlineExceeded:
+                logger.warning("paint enemy summoners info timeout", TAG)
+                return
 
             # 这个 info 是已经按照游戏位置排序过的了（若排位）
             self.gameInfoInterface.updateEnemySummoners(info)
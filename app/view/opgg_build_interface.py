@@ -8,7 +8,7 @@ from PyQt5.QtCore import Qt, pyqtSignal, QEasingCurve
 from PyQt5.QtGui import QPixmap, QColor
 from qasync import asyncSlot
 
-from app.lol.tools import ToolsTranslator
+from app.lol.localization import localization
 from app.components.animation_frame import ColorAnimationFrame, NoBorderColorAnimationFrame
 from app.components.transparent_button import PrimaryButton
 from app.components.champion_icon_widget import RoundIcon, RoundedLabel
@@ -129,14 +129,14 @@ class ChampionTitleBar(ColorAnimationFrame):
         self.setVisible(False)
 
     def updateWidget(self, data):
-        ts = ToolsTranslator()
+        ts = localization()
         self.setType(f"tier{data['tier']}")
 
         self.icon.setIcon(data['icon'])
         self.name.setText(data['name'])
 
         if data['position'] != 'none':
-            self.position.setText(ts.positionMap[data['position']])
+            self.position.setText(ts.positions[data['position']])
             self.position.setVisible(True)
         else:
             self.position.setVisible(False)
@@ -26,7 +26,9 @@ from app.components.summoner_name_button import SummonerName
 from app.components.animation_frame import ColorAnimationFrame, CardWidget
 from app.components.color_label import ColorLabel
 from app.lol.connector import connector
-from app.lol.exceptions import SummonerGamesNotFound, SummonerNotFound
+from app.lol.exceptions import SummonerGamesNotFound, SummonerNotFound, DeadlineExceeded
+from app.lol.scheduler import Priority, priority
+from app.lol.deadline import deadline
 from app.lol.tools import parseGameData, parseGameDetailData, parseGamesDataConcurrently
 from ..components.seraphine_interface import SeraphineInterface
 
@@ -720,7 +722,7 @@ class SummonerInfoBar(CardWidget):
 
                 tier, divison, lp = summoner["tier"], summoner["division"], summoner["lp"]
                 if tier != "":
-                    self.rankIcon.setToolTip(f"{tier} {divison} {lp}")
+                    self.rankIcon.setToolTip(f"{tier} {divison} {lp}".strip())
                 else:
                     self.rankIcon.setToolTip(self.tr("Unranked"))
 
@@ -1190,23 +1192,16 @@ class SearchInterface(SeraphineInterface):
 
         # 连续查多个人时, 将前面正在查的task给release掉
         while self.puuid == puuid:
-            # 为加载战绩详情让行
-            while (
-                (self.detailViewLoadTask and not self.detailViewLoadTask.done())
-                or
-                (self.window().careerInterface.loadGamesTask and not self.window(
-                ).careerInterface.loadGamesTask.done())
-            ):
-                await asyncio.sleep(.2)
-
-            try:
-                games = await connector.getSummonerGamesByPuuidSlowly(
-                    puuid, begIdx, endIdx)
-            except SummonerGamesNotFound:
-                # TODO 这里可以弹个窗  -- By Zzaphkiel
-                # NOTE 触发 SummonerGamesNotFound 时, 异常信息会通过 connector 下发到 main_window 的 __onShowLcuConnectError
-                #  理论上会有弹框提示  -- By Hpero4
-                return
+            # 以后台优先级加载, 战绩详情、生涯等用户正在等待的请求会优先发出
+            with priority(Priority.BACKGROUND):
+                try:
+                    games = await connector.getSummonerGamesByPuuidSlowly(
+                        puuid, begIdx, endIdx)
+                except SummonerGamesNotFound:
+                    # TODO 这里可以弹个窗  -- By Zzaphkiel
+                    # NOTE 触发 SummonerGamesNotFound 时, 异常信息会通过 connector 下发到 main_window 的 __onShowLcuConnectError
+                    #  理论上会有弹框提示  -- By Hpero4
+                    return
 
             # 1000 局搜完了，或者正好上一次就是最后
             # 在切换了puuid时, 就不要再把数据刷到Games上了 -- By Hpero4
@@ -1214,7 +1209,8 @@ class SearchInterface(SeraphineInterface):
                 return
 
             # 处理数据，交给 gamesTab，更新其 games 成员以及 queueIdMap
-            games = await parseGamesDataConcurrently(games['games'])
+            with priority(Priority.BACKGROUND):
+                games = await parseGamesDataConcurrently(games['games'])
 
             if self.puuid != puuid:
                 return
@@ -1261,17 +1257,22 @@ class SearchInterface(SeraphineInterface):
         if cfg.get(cfg.showTierInGameInfo):
             self.gamesView.gameDetailView.setLoadingPageEnabled(True)
 
-        # NOTE self.detailViewLoadTask 用于标记详情正在加载, self.loadGame会为其让行 -- By Hpero4
-        self.detailViewLoadTask = asyncio.create_task(
-            connector.getGameDetailByGameId(gameId))
-        game = await self.detailViewLoadTask
-
-        # 加载GameDetail的过程中, 切换了搜索对象(self.puuid变更), 将后续任务pass -- By Hpero4
-        if puuid == self.puuid:
-            self.detailViewLoadTask = asyncio.create_task(
-                parseGameDetailData(puuid, game))
-            game = await self.detailViewLoadTask
-            self.gamesView.gameDetailView.updateGame(game)
+        # 用户在等着看, 太久没加载出来就算了, 把名额让给其他请求
+        try:
+            with deadline(15):
+                # NOTE self.detailViewLoadTask 用于标记详情正在加载 -- By Hpero4
+                self.detailViewLoadTask = asyncio.create_task(
+                    connector.getGameDetailByGameId(gameId))
+                game = await self.detailViewLoadTask
+
+                # 加载GameDetail的过程中, 切换了搜索对象(self.puuid变更), 将后续任务pass -- By Hpero4
+                if puuid == self.puuid:
+                    self.detailViewLoadTask = asyncio.create_task(
+                        parseGameDetailData(puuid, game))
+                    game = await self.detailViewLoadTask
+                    self.gamesView.gameDetailView.updateGame(game)
+        except DeadlineExceeded:
+            pass
 
         if cfg.get(cfg.showTierInGameInfo):
             self.gamesView.gameDetailView.setLoadingPageEnabled(False)
@@ -18,6 +18,7 @@ from app.components.setting_cards import (LineEditSettingCard, GameTabColorSetti
                                           LooseSwitchSettingCard, ProxySettingCard,
                                           )
 from app.components.message_box import MultiPathSettingMsgBox
+from app.lol.assets import assets
 
 
 class SettingInterface(SeraphineInterface):
@@ -326,6 +327,8 @@ class SettingInterface(SeraphineInterface):
 
                 os.remove(filePath)
 
+            assets.discard(path)
+
     def __showFlyout(self):
         view = TeachingTipView(
             title=self.tr("Really?"),
@@ -0,0 +1,87 @@
+"""
+录制 `python -m bench.run fastjson` 使用的响应
+
+需要在 Windows 上打开并登录客户端, 以当前召唤师的数据录制:
+
+    python -m bench.record
+
+每个接口的响应原样 (bytes) 存到 `bench/fixtures/<名字>.json`, 录好之后提交到仓库;
+SGP 只有国服才有, 其他服务器跳过
+"""
+import os
+
+import requests
+import urllib3
+
+from app.common.util import getLolClientPidSlowly, getPortTokenServerByPid
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+MAINLAND = {'tj100', 'hn1', 'cq100', 'gz100', 'nj100', 'hn10', 'tj101', 'bgp2'}
+
+
+def save(name, body: bytes):
+    os.makedirs(FIXTURES, exist_ok=True)
+
+    path = os.path.join(FIXTURES, f"{name}.json")
+    with open(path, 'wb') as f:
+        f.write(body)
+
+    print(f"{path}: {len(body) / 1024:.1f} KiB")
+
+
+def main():
+    urllib3.disable_warnings()
+
+    pid = getLolClientPidSlowly()
+    if not pid:
+        raise SystemExit("LeagueClientUx is not running")
+
+    port, token, server = getPortTokenServerByPid(pid)
+
+    lcu = requests.Session()
+    lcu.auth = ('riot', token)
+    lcu.verify = False
+
+    def lcuGet(path, params=None):
+        res = lcu.get(f"https://127.0.0.1:{port}{path}", params=params)
+        res.raise_for_status()
+
+        return res
+
+    # 初始化时的大 json
+    for name in ("items", "skins", "perks", "perkstyles", "champion-summary"):
+        save(f"lcu-{name}", lcuGet(f"/lol-game-data/assets/v1/{name}.json").content)
+
+    puuid = lcuGet("/lol-summoner/v1/current-summoner").json()['puuid']
+
+    history = lcuGet(f"/lol-match-history/v1/products/lol/{puuid}/matches",
+                     {'begIndex': 0, 'endIndex': 19})
+    save("lcu-match-history", history.content)
+
+    games = history.json()['games']['games']
+    if games:
+        save("lcu-game-detail",
+             lcuGet(f"/lol-match-history/v1/games/{games[0]['gameId']}").content)
+
+    save("lcu-ranked-stats", lcuGet(f"/lol-ranked/v1/ranked-stats/{puuid}").content)
+
+    if not server or server.lower() not in MAINLAND:
+        return
+
+    server = server.lower()
+    host = f"{server}-k8s-sgp" if server in ('hn1', 'hn10', 'bgp2') else f"{server}-sgp"
+    sgpToken = lcuGet("/entitlements/v1/token").json()['accessToken']
+
+    res = requests.get(
+        f"https://{host}.lol.qq.com:21019/match-history-query/v1/products/lol/player/{puuid}/SUMMARY",
+        params={'startIndex': 0, 'count': 20},
+        headers={"Authorization": f"Bearer {sgpToken}"}, verify=False)
+    res.raise_for_status()
+
+    save("sgp-match-history", res.content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+性能测量, 不随程序发布
+
+    python -m bench.run                 # 全部
+    python -m bench.run pipeline models # 只跑其中几项
+
+- pipeline: `retry` 装饰器调用链本身的开销, 与旧的装饰器对比
+- models:   战绩列表解析成 `GameSummary` 与旧的 dict 的耗时与常驻内存
+- catalog:  游戏数据的查询接口 (英雄名、符文图标、皮肤列表) 建索引前后每次调用的耗时
+- fastjson: 各个 JSON 后端解码 `bench/fixtures` 中录制的响应 (`python -m bench.record`) 的耗时与峰值内存
+"""
+import asyncio
+import gc
+import glob
+import inspect
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+from app.common.fastjson import BACKEND, BACKENDS
+from app.lol.catalog import buildChampionIds, buildRuneIcons, buildSkinLists
+from app.lol.middleware import (compose, invoke, Call, CallMeta, Metrics,
+                                metricsMiddleware, retryMiddleware)
+from app.lol.models import (GameSummary, timeStampToStr, timeStampToShortStr, secsToStr,
+                            championIconPath, itemIconPath, runeIconPath,
+                            summonerSpellIconPath)
+from app.lol.retry import RetryPolicy, RetryStats
+
+
+def benchPipeline():
+    async def noop(self, a, b=None):
+        return a
+
+    async def bench():
+        n = 100000
+        meta = CallMeta(noop)
+        metrics, stats = Metrics(), RetryStats()
+        chain = compose([
+            metricsMiddleware(lambda c: metrics, lambda c: c.meta.name),
+            retryMiddleware(RetryPolicy(), lambda c: stats),
+        ], invoke)
+
+        start = time.perf_counter()
+        for i in range(n):
+            await noop(None, i)
+        bare = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(n):
+            await chain(Call(meta, (None, i), {}))
+        piped = time.perf_counter() - start
+
+        # 旧的 retry 装饰器每次调用都会执行的部分
+        start = time.perf_counter()
+        for i in range(n):
+            names = list(inspect.signature(noop).parameters.keys())[1:]
+            f"args = {dict(zip(names, (i,)))}|kwargs = {{}}"
+            await noop(None, i)
+        legacy = time.perf_counter() - start
+
+        print(f"bare:     {bare / n * 1e6:.2f} us/call")
+        print(f"pipeline: {(piped - bare) / n * 1e6:.2f} us/call overhead")
+        print(f"legacy:   {(legacy - bare) / n * 1e6:.2f} us/call overhead")
+
+    asyncio.run(bench())
+
+
+def benchModels():
+    n = 1000
+
+    def fixture(i):
+        return {
+            'gameId': 7000000000 + i, 'gameCreation': 1700000000000 + i * 3600000,
+            'gameDuration': 1500 + i % 900, 'queueId': 420, 'mapId': 11,
+            'participants': [{
+                'championId': i % 160 + 1, 'spell1Id': 4, 'spell2Id': 14,
+                'stats': {
+                    'champLevel': 16, 'kills': i % 15, 'deaths': i % 9, 'assists': i % 20,
+                    **{f'item{k}': 3000 + (i * 7 + k) % 500 for k in range(7)},
+                    'perk0': 8112, 'totalMinionsKilled': 180, 'neutralMinionsKilled': 12,
+                    'goldEarned': 12000 + i, 'win': i % 2 == 0,
+                    'gameEndedInEarlySurrender': False,
+                },
+                'timeline': {'lane': 'MIDDLE', 'role': 'SOLO'},
+            }],
+        }
+
+    def legacy(game):
+        # 旧的 parseGameData 返回的 dict (模式名、地图名、位置用固定字符串代替)
+        participant = game['participants'][0]
+        stats = participant['stats']
+
+        return {
+            'queueId': game['queueId'],
+            'gameId': game['gameId'],
+            'time': timeStampToStr(game['gameCreation']),
+            'shortTime': timeStampToShortStr(game['gameCreation']),
+            'name': "排位赛 单排/双排",
+            'map': "召唤师峡谷",
+            'duration': secsToStr(game['gameDuration']),
+            'remake': stats['gameEndedInEarlySurrender'],
+            'win': stats['win'],
+            'championId': participant['championId'],
+            'championIcon': championIconPath(participant['championId']),
+            'spell1Icon': summonerSpellIconPath(participant['spell1Id']),
+            'spell2Icon': summonerSpellIconPath(participant['spell2Id']),
+            'champLevel': stats['champLevel'],
+            'kills': stats['kills'],
+            'deaths': stats['deaths'],
+            'assists': stats['assists'],
+            'itemIcons': [itemIconPath(stats[f'item{k}']) for k in range(7)],
+            'runeIcon': runeIconPath(stats['perk0']),
+            'cs': stats['totalMinionsKilled'] + stats['neutralMinionsKilled'],
+            'gold': stats['goldEarned'],
+            'timeStamp': game['gameCreation'],
+            'position': "中单",
+        }
+
+    class Manager:
+        # 与 legacy 一样用固定的名字
+        def getNameMapByQueueId(self, queueId):
+            return {'name': "排位赛 单排/双排", 'map': "召唤师峡谷"}
+
+    manager = Manager()
+
+    def measure(parse):
+        games = [fixture(i) for i in range(n)]
+
+        start = time.perf_counter()
+        [parse(game) for game in games]
+        elapsed = time.perf_counter() - start
+
+        gc.collect()
+        tracemalloc.start()
+        parsed = [parse(game) for game in games]
+
+        # 原始数据释放之后, 留下来的才是真正占用的内存
+        del games
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        return elapsed, retained, parsed
+
+    for label, parse in (("dict", legacy),
+                         ("record", lambda game: GameSummary.fromLcu(game, manager))):
+        elapsed, retained, parsed = measure(parse)
+        print(f"{label:7} parse {elapsed / n * 1e6:7.2f} us/game, "
+              f"retained {retained / n:7.1f} B/game")
+
+
+def benchCatalog():
+    champions = 170
+    skinsPerChampion = 12
+
+    champs = {i * 3 + 1: f"champion{i}" for i in range(champions)}
+    championsData = {
+        name: {'id': championId, 'skins': {
+            f"{name} skin{k}": {'skinId': championId * 1000 + k,
+                                'splashPath': f"/splash/{championId}/{k}.jpg",
+                                'uncenteredSplashPath': f"/uncentered/{championId}/{k}.jpg"}
+            for k in range(skinsPerChampion)}}
+        for championId, name in champs.items()}
+    styles = [{'id': 8000 + i * 100, 'iconPath': f"/styles/{i}.png"} for i in range(5)]
+    runes = {8000 + i * 100 + k: {'icon': f"/runes/{i}/{k}.png", 'name': "", 'desc': ""}
+             for i in range(5) for k in range(1, 15)}
+
+    championIds = buildChampionIds(champs)
+    runeIcons = buildRuneIcons(runes, styles)
+    skinLists = buildSkinLists(championsData, {})
+
+    # 改造前的实现
+    def legacyChampionName(championId):
+        for cid in champs.keys():
+            if cid == championId:
+                return champs[cid]
+
+    def legacyRuneIcon(runeId):
+        try:
+            return runes[runeId]['icon']
+        except:
+            for item in styles:
+                if item['id'] == runeId:
+                    return item['iconPath']
+
+    def legacySkinList(championName):
+        return [item for item in championsData[championName]["skins"].items()]
+
+    # 取中间的 id, 线性扫描平均要走一半
+    championId = list(champs)[champions // 2]
+    championName = champs[championId]
+    styleId = styles[-1]['id']
+
+    cases = [
+        ("getChampionNameById", lambda: legacyChampionName(championId),
+         lambda: champs.get(championId)),
+        ("getChampionIdByName", lambda: championsData[championName]['id'],
+         lambda: championIds[championName]),
+        ("getRuneIconPath (style)", lambda: legacyRuneIcon(styleId),
+         lambda: runeIcons.get(styleId)),
+        ("getSkinListByChampionName", lambda: legacySkinList(championName),
+         lambda: skinLists.get(championName, [])),
+    ]
+
+    def perCall(func):
+        n, _ = timeit.Timer(func).autorange()
+        return min(timeit.repeat(func, number=n, repeat=5)) / n
+
+    print(f"{'accessor':28} {'before':>10} {'after':>10}")
+    for name, before, after in cases:
+        print(f"{name:28} {perCall(before) * 1e9:8.1f}ns {perCall(after) * 1e9:8.1f}ns")
+
+
+def benchFastjson():
+    fixtures = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "*.json")))
+
+    if not fixtures:
+        print("no fixtures, record them first: python -m bench.record")
+        return
+
+    def measure(loads, body, n):
+        tracemalloc.start()
+        loads(body)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(n):
+            loads(body)
+
+        return (time.perf_counter() - start) / n, peak
+
+    print(f"default backend: {BACKEND}")
+
+    for path in fixtures:
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        n = max(3, min(200, 20_000_000 // max(1, len(body))))
+        print(f"\n{os.path.basename(path)} ({len(body) / 1024:.1f} KiB, {n} runs)")
+
+        for backend, (load, _) in BACKENDS.items():
+            elapsed, peak = measure(load, body, n)
+            print(f"  {backend:8} {elapsed * 1000:8.3f} ms  peak {peak / 1024:8.1f} KiB")
+
+
+BENCHES = {
+    'pipeline': benchPipeline,
+    'models': benchModels,
+    'catalog': benchCatalog,
+    'fastjson': benchFastjson,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHES:
+        print(f"== {name}")
+        BENCHES[name]()
+        print()
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("aiohttp")
+pytest.importorskip("win32api")
+
+from app.lol.connector import ActiveConnector, ConnectorPool, LolClientConnector
+
+
+def poolOf(*pids):
+    pool = ConnectorPool()
+    pool.connectors = {pid: LolClientConnector() for pid in pids}
+
+    return pool
+
+
+def testClosingInactiveConnectorKeepsActive():
+    pool = poolOf(1, 2)
+    active, inactive = pool.connectors[1], pool.connectors[2]
+    pool._ConnectorPool__bind(active)
+
+    asyncio.run(inactive.close())
+
+    assert pool.active is active
+    assert active.isActive
+    assert not inactive.isActive
+    assert ActiveConnector(pool).isActive
+
+
+def testClosingActiveConnectorKeepsBinding():
+    pool = poolOf(1)
+    active = pool.connectors[1]
+    pool._ConnectorPool__bind(active)
+    pipeline = active.lcuGetChain
+
+    asyncio.run(ActiveConnector(pool).close())
+
+    # 只重置客户端相关的状态, 是否绑定由连接池决定
+    assert pool.active is active
+    assert active.isActive
+    assert active.lcuSess is None
+    assert active.lcuGetChain is pipeline
@@ -0,0 +1,66 @@
+import asyncio
+
+from app.lol.deadline import EndpointTimeouts, deadline, deadlineMiddleware, timeoutMiddleware
+from app.lol.exceptions import CircuitOpen, DeadlineExceeded
+from app.lol.middleware import compose, Request
+from app.lol.upstream import CircuitBreaker, Upstream, upstreamMiddleware
+
+
+def chain(upstream, send, seconds=.01):
+    """
+    与 `LolClientConnector.__initPipelines` 中 SGP GET 的顺序相同: 截止时间 -> 限速熔断 -> 超时 -> 发送
+    """
+    timeouts = EndpointTimeouts([], seconds)
+
+    return compose([deadlineMiddleware(), upstreamMiddleware(lambda req: upstream),
+                    timeoutMiddleware(lambda req: timeouts)], send)
+
+
+async def hang(req):
+    await asyncio.sleep(10)
+
+
+def testTimeoutsOpenBreaker():
+    sgp = Upstream('sgp', 1000, 1000, 5, 30.)
+    call = chain(sgp, hang)
+
+    async def main():
+        for _ in range(5):
+            try:
+                await call(Request("sgp", "GET", "/match-history-query/v1/products/lol/player/x/SUMMARY"))
+            except asyncio.TimeoutError:
+                pass
+            else:
+                assert False
+
+        try:
+            await call(Request("sgp", "GET", "/match-history-query/v1/products/lol/player/x/SUMMARY"))
+        except CircuitOpen as e:
+            assert e.upstream == 'sgp'
+        else:
+            assert False
+
+    asyncio.run(main())
+
+    assert sgp.breaker.state == CircuitBreaker.OPEN
+    assert not sgp.available()
+
+
+def testCallerDeadlineIsNotUpstreamFailure():
+    sgp = Upstream('sgp', 1000, 1000, 2, 30.)
+    call = chain(sgp, hang, seconds=5)
+
+    async def main():
+        for _ in range(3):
+            with deadline(.01):
+                try:
+                    await call(Request("sgp", "GET", "/"))
+                except DeadlineExceeded:
+                    pass
+                else:
+                    assert False
+
+    asyncio.run(main())
+
+    assert sgp.breaker.state == CircuitBreaker.CLOSED
+    assert sgp.breaker.failures == 0